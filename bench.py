@@ -0,0 +1,246 @@
+import click
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# הכלי מריץ את הפקודות האמיתיות של main.py מול moto (שרת מקומי שמחקה את AWS), בלי חשבון אמיתי
+# התקנה: pip install "moto[server]"
+
+# --- CONFIGURATION ---
+# כמויות "אמיתיות" של משאבים. --scale מקטין (או מגדיל) את כולן באותו יחס
+VOLUMES = {
+    "INSTANCES": 10000,
+    "ZONES": 2000,
+    "OBJECTS": 100000,
+    "FILE_MB": 2048
+}
+
+# שמות קבועים של המשאבים שהבנצ'מרק יוצר
+BENCH_BUCKET = "bench-bucket"
+BENCH_DOMAIN = "bench-zone-{}.com"
+# השרתים נזרעים ב-Region נפרד: כך ec2 list/stop רואים את כולם, ו-ec2 create (ב-Region הרגיל)
+# לא נתקע על MAX_INSTANCES ומודד יצירה אמיתית
+BENCH_EC2_REGION = "us-west-2"
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+# מריץ את main.py כמו "python main.py ...", ובסוף כותב לקובץ את שיא הזיכרון ואם botocore נטען
+# (ru_maxrss של תהליך-בן בלינוקס כולל גם את הזיכרון של האבא ברגע ה-fork, אז קוראים את VmHWM מבפנים)
+RUNNER = """
+import atexit, json, os, runpy, sys
+
+def report_peak():
+    with open('/proc/self/status') as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+    with open(os.environ['BENCH_RSS_FILE'], 'w') as f:
+        json.dump({'peak_kb': peak_kb, 'botocore': 'botocore' in sys.modules}, f)
+
+atexit.register(report_peak)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def free_port():
+    """Returns a free local TCP port for the moto server"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def aws_env(endpoint, home):
+    """Environment that points boto3 (in this process and in children) at moto"""
+    env = dict(os.environ)
+    env.update({
+        'AWS_ENDPOINT_URL': endpoint,
+        'AWS_ACCESS_KEY_ID': 'bench',
+        'AWS_SECRET_ACCESS_KEY': 'bench',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        # תיקייה ריקה לכל ריצה, כדי שהמטמון המקומי לא יסתיר קריאות לאמזון
+        'PLATFORM_CLI_HOME': home
+    })
+    return env
+
+
+def seed(endpoint, volumes, workdir):
+    """Fills the moto backend with tool-owned (and foreign) resources"""
+    import boto3
+    sys.path.insert(0, os.path.dirname(MAIN))
+    from main import get_aws_tags
+    session = boto3.session.Session(aws_access_key_id='bench', aws_secret_access_key='bench', region_name='us-east-1')
+    ec2_client = session.client('ec2', endpoint_url=endpoint, region_name=BENCH_EC2_REGION)
+    s3_client = session.client('s3', endpoint_url=endpoint)
+    route53_client = session.client('route53', endpoint_url=endpoint)
+    tags = get_aws_tags({'Name': 'bench'})
+    seeded = {}
+
+    # שרתים - עד 1000 בקריאה אחת
+    instance_ids = []
+    remaining = volumes['INSTANCES']
+    while remaining > 0:
+        count = min(remaining, 1000)
+        response = ec2_client.run_instances(ImageId='ami-0532be01f26a3de55', InstanceType='t3.micro',
+                                            MinCount=count, MaxCount=count,
+                                            TagSpecifications=[{'ResourceType': 'instance', 'Tags': tags}])
+        instance_ids += [instance['InstanceId'] for instance in response['Instances']]
+        remaining -= count
+    seeded['instance_id'] = instance_ids[0] if instance_ids else None
+
+    # Zones - רק חצי מהם "שלנו", כמו בחשבון אמיתי שיש בו גם משאבים של אחרים
+    def create_zone(index):
+        zone = route53_client.create_hosted_zone(Name=BENCH_DOMAIN.format(index), CallerReference=f'bench-{index}')
+        zone_id = zone['HostedZone']['Id'].split('/')[-1]
+        if index % 2 == 0:
+            route53_client.change_tags_for_resource(ResourceType='hostedzone', ResourceId=zone_id, AddTags=tags)
+        return zone_id
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        zone_ids = list(pool.map(create_zone, range(volumes['ZONES'])))
+    seeded['zone_id'] = zone_ids[0] if zone_ids else None
+
+    # דלי עם הרבה אובייקטים קטנים
+    s3_client.create_bucket(Bucket=BENCH_BUCKET)
+    s3_client.put_bucket_tagging(Bucket=BENCH_BUCKET, Tagging={'TagSet': tags})
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda index: s3_client.put_object(Bucket=BENCH_BUCKET, Key=f'objects/{index:07d}', Body=b'x'),
+                      range(volumes['OBJECTS'])))
+
+    # קובץ גדול להעלאה ולהורדה (sparse - לא תופס מקום בדיסק עד שכותבים אליו)
+    big_file = os.path.join(workdir, 'big.bin')
+    with open(big_file, 'wb') as f:
+        f.truncate(volumes['FILE_MB'] * 1024 * 1024)
+    seeded['big_file'] = big_file
+    return seeded
+
+
+def benchmarks(seeded, workdir):
+    """The CLI commands to measure, in order (later ones may use earlier results), with extra env"""
+    seeded_region = {'AWS_DEFAULT_REGION': BENCH_EC2_REGION}
+    return [
+        ('cli --help', ['--help'], {}),
+        ('ec2 list', ['ec2', 'list', '--output', 'ndjson'], seeded_region),
+        ('ec2 create', ['ec2', 'create', '--name', 'bench-new'], {}),
+        ('ec2 stop', ['ec2', 'stop', '--instance_id', seeded['instance_id']], seeded_region),
+        ('s3 create', ['s3', 'create', '--name', 'bench-new-bucket', '--access', 'private'], {}),
+        ('s3 upload', ['s3', 'upload', '--bucket', BENCH_BUCKET, '--file', seeded['big_file'], '--key', 'big.bin'], {}),
+        ('s3 download', ['s3', 'download', '--bucket', BENCH_BUCKET, '--key', 'big.bin',
+                         '--file', os.path.join(workdir, 'big.out')], {}),
+        ('route53 create', ['route53', 'create', '--domain', 'bench-new.com'], {}),
+        ('route53 list', ['route53', 'list'], {}),
+        ('route53 manage-records', ['route53', 'manage-records', '--zoneid', seeded['zone_id'],
+                                    '--name', 'www.' + BENCH_DOMAIN.format(0), '--value', '1.2.3.4',
+                                    '--action', 'UPSERT'], {}),
+    ]
+
+
+def run_command(args, env, workdir):
+    """Runs `python main.py ...` in a child process and measures it"""
+    trace_file = os.path.join(workdir, 'trace.json')
+    if os.path.exists(trace_file):
+        os.remove(trace_file)
+    # --trace-file של ה-CLI עצמו נותן לנו את מספר הקריאות לאמזון
+    command = [sys.executable, '-c', RUNNER, MAIN] + (args if args == ['--help'] else ['--trace-file', trace_file] + args)
+    rss_file = os.path.join(workdir, 'rss.txt')
+    started = time.perf_counter()
+    process = subprocess.run(command, env={**env, 'BENCH_RSS_FILE': rss_file},
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - started
+    with open(rss_file) as f:
+        report = json.load(f)
+
+    calls = 0
+    if os.path.exists(trace_file):
+        with open(trace_file) as f:
+            calls = sum(1 for event in json.load(f)['traceEvents'] if not event['name'].startswith('client.'))
+    failed = process.returncode != 0 or b'Error' in process.stdout
+    return {'wall': wall, 'calls': calls, 'rss_mb': report['peak_kb'] / 1024, 'failed': failed,
+            'botocore': report['botocore']}
+
+
+def check_startup(workdir):
+    """Fails if `main.py --help` imports botocore (boto3 must stay lazy)"""
+    result = run_command(['--help'], dict(os.environ), workdir)
+    if result['botocore']:
+        raise click.ClickException('startup regression: `main.py --help` imported botocore')
+    return result
+
+
+def print_results(results, baseline):
+    """Prints the results table, with the change against a baseline if given"""
+    print(f"{'COMMAND':26} {'WALL s':>9} {'API CALLS':>10} {'PEAK RSS MB':>12}" + ('   vs BASELINE' if baseline else ''))
+    for name, result in results.items():
+        line = f"{name:26} {result['wall']:9.2f} {result['calls']:10} {result['rss_mb']:12.1f}"
+        if baseline and name in baseline:
+            before = baseline[name]
+            change = (result['wall'] - before['wall']) / before['wall'] * 100 if before['wall'] else 0
+            line += f"   {change:+6.1f}% wall, {result['calls'] - before['calls']:+d} calls"
+        if result['failed']:
+            line += '   (command reported an error)'
+        print(line)
+
+
+@click.command()
+@click.option('--scale', default=1.0, show_default=True, help='Multiply all seeded volumes (e.g. 0.01 for a quick run)')
+@click.option('--only', multiple=True, help='Only run benchmarks whose name starts with this (repeatable)')
+@click.option('--save-baseline', type=click.Path(dir_okay=False), help='Write the results to this JSON file')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Compare against a saved baseline')
+@click.option('--startup-only', is_flag=True, help='Only check that --help does not import botocore (no moto needed)')
+def bench(scale, only, save_baseline, baseline, startup_only):
+    """Benchmark every CLI command against a local moto server"""
+    if startup_only:
+        with tempfile.TemporaryDirectory() as workdir:
+            result = check_startup(workdir)
+        print(f"cli --help: {result['wall']:.2f}s, {result['rss_mb']:.1f} MB, botocore not imported")
+        return
+
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise click.ClickException('moto is required: pip install "moto[server]"')
+
+    volumes = {name: max(1, int(value * scale)) for name, value in VOLUMES.items()}
+    port = free_port()
+    # בלי לוג של כל בקשה שמגיעה לשרת
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    endpoint = f'http://127.0.0.1:{port}'
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            print(f"Seeding {volumes['INSTANCES']} instances, {volumes['ZONES']} zones, "
+                  f"{volumes['OBJECTS']} objects and a {volumes['FILE_MB']} MB file...", file=sys.stderr)
+            started = time.perf_counter()
+            seeded = seed(endpoint, volumes, workdir)
+            print(f"Seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+            results = {}
+            for name, args, extra_env in benchmarks(seeded, workdir):
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                # כל פקודה מקבלת תיקיית בית חדשה - בלי מטמון מהפקודה הקודמת
+                home = tempfile.mkdtemp(dir=workdir)
+                results[name] = run_command(args, {**aws_env(endpoint, home), **extra_env}, workdir)
+                if name == 'cli --help' and results[name]['botocore']:
+                    raise click.ClickException('startup regression: `main.py --help` imported botocore')
+                print(f"{name}: {results[name]['wall']:.2f}s", file=sys.stderr)
+    finally:
+        server.stop()
+
+    previous = None
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f)['results']
+    print_results(results, previous)
+    if save_baseline:
+        with open(save_baseline, 'w') as f:
+            json.dump({'volumes': volumes, 'results': results}, f, indent=2)
+        print(f"Baseline written to {save_baseline}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    bench()
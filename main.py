@@ -1,7 +1,22 @@
-import boto3
 import click
+import contextvars
+import csv
+import json
 import os
 import datetime
+import queue
+import random
+import re
+import socket
+import fnmatch
+import hashlib
+import io
+import shlex
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 
 # --- CONFIGURATION ---
 # מנסה למצוא את שם המשתמש הנוכחי במערכת ההפעלה (לצורך תיעוד בטאגים)
@@ -25,6 +40,13 @@ EC2_CONFIG = {
     "REGION": "us-east-1",
     "ALLOWED_TYPES": ["t3.micro", "t2.small"],
     "MAX_INSTANCES": 2,
+    # כל המצבים של שרת חוץ מ-terminated (שרת שנמחק לא נחשב יותר "שלנו")
+    "ACTIVE_STATES": ["pending", "running", "stopping", "stopped", "shutting-down"],
+    # כמה שרתים שולחים בקריאה אחת של stop/start/terminate
+    "ACTION_BATCH_SIZE": 200,
+    # ec2 watch / --wait: כמה שניות מחכים בין בדיקות בהתחלה, ועד כמה זה גדל כשאף שרת לא משנה מצב
+    "WATCH_MIN_DELAY": 2,
+    "WATCH_MAX_DELAY": 15,
     "AMI_MAP": {
         "amazon": "ami-0532be01f26a3de55",  # שים לב: AMI משתנה בין Regions
         "ubuntu": "ami-0b6c6ebed2801a5cb"
@@ -40,12 +62,91 @@ S3_CONFIG = {
                 }
             }
         ]
-    }
+    },
+    # ברירות מחדל להעברת קבצים גדולים: גודל חלק (ב-MB) וכמה חלקים עוברים במקביל
+    "PART_SIZE_MB": 16,
+    "MAX_CONCURRENCY": 10,
+    # ב-sync: כמה חלקים של קובץ אחד עוברים במקביל (כל קובץ כזה תופס עד כמה חיבורים)
+    "SYNC_FILE_CONCURRENCY": 4,
+    # כמה אובייקטים נמחקים בקריאת delete_objects אחת (המקסימום ש-AWS מרשה)
+    "DELETE_BATCH_SIZE": 1000
+}
+
+# יחידת מידה נוחה לגדלים של קבצים
+MB = 1024 * 1024
+
+# רוחב כל עמודה בפלט מסוג טבלה (עמודה שלא מופיעה כאן מקבלת 20 תווים)
+OUTPUT_WIDTHS = {
+    "region": 16,
+    "id": 20,
+    "name": 24,
+    "state": 14,
+    "type": 12,
+    "owner": 16,
+    "launch_time": 25
 }
 
 ROUTE53_CONFIG = {
     "DEFAULT_TTL": 300,
-    "RecordType": "A"
+    "RecordType": "A",
+    # כמה Zones אפשר לשלוח בקריאה אחת של list_tags_for_resources (המקסימום ש-AWS מרשה הוא 10)
+    "TAGS_BATCH_SIZE": 10,
+    # כמה קריאות תגיות ירוצו במקביל בזמן ה-list
+    "MAX_WORKERS": 4,
+    # מגבלות של AWS על ChangeBatch אחד: מספר שינויים, מספר ערכים וסך התווים בערכים
+    "MAX_BATCH_CHANGES": 1000,
+    "MAX_BATCH_RECORDS": 1000,
+    "MAX_BATCH_CHARS": 32000
+}
+
+# הגדרות שחלות על כל הקריאות לאמזון (מכל הפקודות ומכל ה-Threads בתהליך)
+API_CONFIG = {
+    # כמה בקשות בשנייה מותר לשלוח לכל שירות (None = בלי הגבלה בצד שלנו). ב-EC2 המגבלה היא לכל Region
+    # אפשר לשנות עם PLATFORM_CLI_RATE_LIMITS, למשל "route53=3,ec2=50,s3=0" (0 = בלי הגבלה)
+    "RATE_LIMITS": {"route53": 5, "ec2": 20, "s3": None},
+    # מצב ה-Retry של botocore: adaptive מאט את ה-Client לבד כשמקבלים Throttling
+    "RETRY_MODE": os.environ.get('AWS_RETRY_MODE', 'adaptive'),
+    "MAX_ATTEMPTS": int(os.environ.get('AWS_MAX_ATTEMPTS', 10)),
+    # כמה חיבורי HTTP פתוחים כל Client שומר לשימוש חוזר (ברירת המחדל של botocore היא 10).
+    # אפשרויות המקביליות (--concurrency, --workers) מוגבלות כך שלא יעברו את המספר הזה
+    "MAX_POOL_CONNECTIONS": 100,
+    # אחרי Throttling כל ה-Threads של אותו שירות מחכים: זמן אקראי עד BASE * 2^n, ולא יותר מ-MAX שניות
+    "BACKOFF_BASE": 0.5,
+    "BACKOFF_MAX": 20,
+    # קודי השגיאה שבהם אמזון אומרת "לאט יותר" (ולא שמשהו באמת לא תקין)
+    "THROTTLING_CODES": {"Throttling", "ThrottlingException", "ThrottledException", "RequestThrottled",
+                         "RequestThrottledException", "RequestLimitExceeded", "TooManyRequestsException",
+                         "SlowDown", "PriorRequestNotComplete", "ProvisionedThroughputExceededException"}
+}
+
+# הגדרות של המטמון המקומי (Cache) שחוסך בדיקות בעלות חוזרות מול AWS
+CACHE_CONFIG = {
+    # התיקייה שבה הכלי שומר מידע בין הרצות
+    "DIR": os.environ.get('PLATFORM_CLI_HOME', os.path.join(os.path.expanduser('~'), '.yarin-platform-cli')),
+    # כמה שניות תוצאה של בדיקת בעלות נחשבת עדכנית (0 = לא להשתמש במטמון בכלל)
+    "OWNERSHIP_TTL": int(os.environ.get('PLATFORM_CLI_CACHE_TTL', 3600)),
+    # כמה משאבים לכל היותר נשמור. מעבר לזה נמחק את אלו שלא השתמשו בהם הכי הרבה זמן (LRU)
+    "MAX_ENTRIES": 5000,
+    # אחרי כמה שניות inventory refresh בודק שוב תגיות של דלי או Zone שכבר מופיע באינדקס
+    "INVENTORY_TTL": int(os.environ.get('PLATFORM_CLI_INVENTORY_TTL', 86400))
+}
+
+# הגדרות של מצב השרת (serve) שמריץ פקודות בתהליך אחד חם
+DAEMON_CONFIG = {
+    "SOCKET": os.environ.get('PLATFORM_CLI_SOCKET', os.path.join(CACHE_CONFIG['DIR'], 'daemon.sock')),
+    # כמה פקודות רצות במקביל בתוך השרת
+    "MAX_REQUESTS": 32,
+    # ארגומנטים שבגללם הפקודה תמיד רצה מקומית ולא נשלחת לשרת
+    "LOCAL_ONLY": ["serve", "--timings", "--trace-file", "--help"]
+}
+
+BATCH_CONFIG = {
+    # כמה צעדים רצים במקביל כברירת מחדל
+    "MAX_WORKERS": 8,
+    # צעד שהדפיס שורה שמתחילה באחד מאלה נחשב כנכשל (גם אם הפקודה לא החזירה קוד שגיאה)
+    "FAILURE_PREFIXES": ("Error:", "Access Denied:"),
+    # פקודות וארגומנטים שאי אפשר להריץ כצעד בתוך batch
+    "NOT_ALLOWED": ["batch", "serve", "--timings", "--trace-file"]
 }
 
     # Helper Functions
@@ -62,13 +163,591 @@ def get_aws_tags(extra_tags=None):
     return [{'Key': k, 'Value': v} for k, v in final_dict.items()]
 
 
+def is_cli_owned(tags):
+    """Returns True if the AWS tag list contains our CreatedBy signature"""
+    # עובר על רשימת התגיות בפורמט של AWS ומחפש את ה"חתימה" של הכלי
+    for tag in tags:
+        if tag['Key'] == 'CreatedBy' and tag['Value'] == GLOBAL_TAGS['CreatedBy']:
+            return True
+    return False
+
+
+def chunks(items, size):
+    """Splits a list into lists of at most `size` items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ThreadPool(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose workers run in a copy of the caller's context"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        # כל משימה רצה בעותק של ה-Context של מי ששלח אותה, כך שב-serve גם ה-Threads
+        # הפנימיים של פקודה יודעים לאיזה לקוח לשלוח את הפלט
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class RateLimiter:
+    """Thread-safe token bucket that allows `rate` calls per second"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        # כמה "אסימונים" אפשר לצבור מראש (ברירת מחדל - שנייה אחת של בקשות)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # כל קריאה לוקחת אסימון אחד (או amount, למשל מספר בתים). אם אין - ישנים עד שיתמלאו
+        # כמות שגדולה מהקיבולת מכניסה את המונה למינוס, וכך הקריאה הבאה תחכה יותר
+        needed = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return
+                sleep_for = (needed - self.tokens) / self.rate
+            time.sleep(sleep_for)
+
+
+class ServiceLimiter:
+    """Client-side limit for one AWS service, shared by every client and thread in the process"""
+
+    def __init__(self, rate):
+        self.bucket = RateLimiter(rate) if rate else None
+        self.lock = threading.Lock()
+        # כמה Throttling רצופים היו, ועד מתי כולם מחכים בגללם
+        self.throttles = 0
+        self.paused_until = 0.0
+
+    def register(self, client):
+        # before-send נקרא לפני כל ניסיון (גם לפני Retry), ו-needs-retry אחרי כל תשובה
+        client.meta.events.register('before-send', self.before_send)
+        client.meta.events.register('needs-retry', self.needs_retry)
+
+    def before_send(self, **kwargs):
+        with self.lock:
+            delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if self.bucket:
+            self.bucket.acquire()
+
+    def needs_retry(self, response=None, **kwargs):
+        # response הוא None כשהייתה שגיאת רשת - זה לא Throttling
+        if response is None:
+            return
+        code = response[1].get('Error', {}).get('Code')
+        with self.lock:
+            if code not in API_CONFIG['THROTTLING_CODES']:
+                self.throttles = 0
+                return
+            # Backoff אקספוננציאלי עם Jitter מלא, כדי שה-Threads לא יחזרו כולם באותו רגע
+            self.throttles += 1
+            delay = random.uniform(0, min(API_CONFIG['BACKOFF_MAX'], API_CONFIG['BACKOFF_BASE'] * 2 ** self.throttles))
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+
+def rate_limits():
+    """The per-service request limits, with PLATFORM_CLI_RATE_LIMITS overrides"""
+    limits = dict(API_CONFIG['RATE_LIMITS'])
+    for item in os.environ.get('PLATFORM_CLI_RATE_LIMITS', '').split(','):
+        service, _, value = item.partition('=')
+        if service.strip() and value.strip():
+            limits[service.strip()] = float(value) or None
+    return limits
+
+
+def is_throttling(error):
+    """True if AWS rejected the call because we were too fast"""
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') in API_CONFIG['THROTTLING_CODES']
+
+
+def describe_error(error):
+    """Error text for the user; throttling is reported apart from real failures"""
+    if is_throttling(error):
+        return f"AWS is throttling requests, even after retries ({error}). Try again later or lower PLATFORM_CLI_RATE_LIMITS."
+    return str(error)
+
+
+class OwnershipCache:
+    """On-disk cache of "was this resource created by this CLI" answers"""
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # חיבור SQLite אחד לכל Thread (אי אפשר לשתף חיבור בין Threads), שנפתח רק בשימוש הראשון
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # SQLite מטפל בנעילות בעצמו, ככה שכמה תהליכים יכולים להשתמש באותו קובץ ביחד
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ownership ('
+                'resource_id TEXT PRIMARY KEY, owned INTEGER NOT NULL, '
+                'checked_at REAL NOT NULL, used_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, service, resource_ids):
+        """Returns {resource id: True/False} for the ids of a service that are cached and not expired"""
+        if self.ttl <= 0 or not resource_ids:
+            return {}
+        now = time.time()
+        # המפתח כולל את השירות, כדי שדלי שהשם שלו זהה ל-ID של שרת או Zone לא "ישאיל" להם את התשובה שלו
+        keys = {f'{service}:{resource_id}': resource_id for resource_id in resource_ids}
+        found = {}
+        # אם אי אפשר לקרוא את המטמון (הרשאות, דיסק מלא) פשוט בודקים מול AWS כרגיל
+        try:
+            conn = self._connect()
+            with conn:
+                # SQLite מגביל את מספר הפרמטרים בשאילתה אחת, אז שואלים בקבוצות
+                for batch in chunks(list(keys), 500):
+                    rows = conn.execute(
+                        f"SELECT resource_id, owned FROM ownership WHERE checked_at >= ? "
+                        f"AND resource_id IN ({','.join('?' * len(batch))})", [now - self.ttl] + batch
+                    ).fetchall()
+                    found.update((key, bool(owned)) for key, owned in rows)
+                # מעדכן את זמן השימוש האחרון (בפעולה אחת לכולם) - זה מה שקובע מי יימחק ראשון
+                conn.executemany('UPDATE ownership SET used_at = ? WHERE resource_id = ?',
+                                 [(now, key) for key in found])
+        except sqlite3.Error:
+            return {}
+        return {keys[key]: owned for key, owned in found.items()}
+
+    def get(self, service, resource_id):
+        """Returns True/False from the cache, or None if unknown or expired"""
+        return self.get_many(service, [resource_id]).get(resource_id)
+
+    def put_many(self, service, answers):
+        """Stores {resource id: owned} answers of a service, positive or negative, in one transaction"""
+        if self.ttl <= 0 or not answers:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO ownership VALUES (?, ?, ?, ?)',
+                    [(f'{service}:{resource_id}', int(owned), now, now) for resource_id, owned in answers.items()]
+                )
+                # מוחק את הרשומות הכי פחות בשימוש אם עברנו את הגודל המקסימלי
+                conn.execute(
+                    'DELETE FROM ownership WHERE resource_id IN ('
+                    'SELECT resource_id FROM ownership ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+        except sqlite3.Error:
+            pass
+
+    def put(self, service, resource_id, owned):
+        """Stores a positive or negative ownership answer"""
+        self.put_many(service, {resource_id: owned})
+
+    def forget_many(self, service, resource_ids):
+        """Drops resources from the cache so the next check goes to AWS"""
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany('DELETE FROM ownership WHERE resource_id = ?',
+                                 [(f'{service}:{resource_id}',) for resource_id in resource_ids])
+        except sqlite3.Error:
+            pass
+
+    def forget(self, service, resource_id):
+        """Drops a resource from the cache so the next check goes to AWS"""
+        self.forget_many(service, [resource_id])
+
+
+# מטמון אחד משותף לכל הפקודות. הקובץ עצמו נפתח רק בשימוש הראשון
+ownership_cache = OwnershipCache(
+    os.path.join(CACHE_CONFIG['DIR'], 'cache.db'),
+    CACHE_CONFIG['OWNERSHIP_TTL'],
+    CACHE_CONFIG['MAX_ENTRIES']
+)
+
+
+class InventoryIndex:
+    """Local SQLite index of resources seen by `inventory refresh`"""
+
+    # העמודות שנשמרות לכל משאב (tags נשמר כ-JSON)
+    COLUMNS = ['service', 'resource_id', 'region', 'name', 'state', 'owner', 'created_at', 'tags', 'owned', 'refreshed_at']
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # owned=0 נשמר גם הוא, כדי שבריענון הבא לא נבדוק שוב תגיות של משאבים שלא שלנו
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS resources ('
+            'service TEXT NOT NULL, resource_id TEXT NOT NULL, region TEXT, name TEXT, state TEXT, '
+            'owner TEXT, created_at TEXT, tags TEXT, owned INTEGER NOT NULL, refreshed_at REAL NOT NULL, '
+            'PRIMARY KEY (service, resource_id))'
+        )
+        return conn
+
+    def upsert(self, rows):
+        """Inserts or replaces resource rows (dicts with the COLUMNS keys)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO resources VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                [tuple(now if column == 'refreshed_at' else row.get(column) for column in self.COLUMNS)
+                 for row in rows]
+            )
+
+    def set_state(self, service, resource_ids, state):
+        """Updates the state of known resources (write-through from commands)"""
+        with self._connect() as conn:
+            conn.executemany(
+                'UPDATE resources SET state = ? WHERE service = ? AND resource_id = ?',
+                [(state, service, resource_id) for resource_id in resource_ids]
+            )
+
+    def remove(self, service, resource_ids):
+        """Deletes rows of resources that this CLI deleted"""
+        with self._connect() as conn:
+            conn.executemany('DELETE FROM resources WHERE service = ? AND resource_id = ?',
+                             [(service, resource_id) for resource_id in resource_ids])
+
+    def fresh_ids(self, service, ttl):
+        """Returns {resource_id: owned} for rows refreshed less than ttl seconds ago"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT resource_id, owned FROM resources WHERE service = ? AND refreshed_at > ?',
+                (service, time.time() - ttl)
+            ).fetchall()
+        return {resource_id: bool(owned) for resource_id, owned in rows}
+
+    def remove_missing(self, service, seen_ids, regions=None):
+        """Deletes rows of a service that no longer exist in AWS"""
+        with self._connect() as conn:
+            query = 'SELECT resource_id FROM resources WHERE service = ?'
+            params = [service]
+            # אם רעננו רק חלק מה-Regions, מוחקים רק מתוכם
+            if regions:
+                query += f" AND region IN ({', '.join('?' * len(regions))})"
+                params += list(regions)
+            known = {row[0] for row in conn.execute(query, params)}
+            missing = known - set(seen_ids)
+            conn.executemany('DELETE FROM resources WHERE service = ? AND resource_id = ?',
+                             [(service, resource_id) for resource_id in missing])
+        return len(missing)
+
+    def query(self, where, params, group_by=None):
+        """Returns owned rows (or counts per group) matching a WHERE clause"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            if group_by:
+                sql = (f'SELECT {group_by}, COUNT(*) AS count FROM resources WHERE owned = 1 {where} '
+                       f'GROUP BY {group_by} ORDER BY count DESC')
+            else:
+                sql = f'SELECT * FROM resources WHERE owned = 1 {where} ORDER BY service, region, name'
+            for row in conn.execute(sql, params):
+                yield dict(row)
+
+
+# האינדקס המקומי של כל המשאבים שלנו (נבנה ע"י inventory refresh)
+inventory_index = InventoryIndex(os.path.join(CACHE_CONFIG['DIR'], 'inventory.db'))
+
+
+def write_through(update):
+    """Runs a local index update without ever failing the AWS command that caused it"""
+    # המשאב כבר נוצר באמזון - תקלה באינדקס המקומי לא צריכה להכשיל את הפקודה
+    try:
+        update()
+    except sqlite3.Error:
+        pass
+
+
+class ApiTimings:
+    """Records every AWS API call (latency, retries, status, bytes) through botocore event hooks"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    def register(self, session):
+        # האירועים של botocore הם היררכיים - before-call תופס את כל השירותים וכל הפעולות
+        session.events.register('before-call', self.before_call)
+        session.events.register('after-call', self.after_call)
+        session.events.register('after-call-error', self.after_call_error)
+
+    def before_call(self, model, params, context, **kwargs):
+        # ה-context הוא מילון שמלווה את הבקשה עד הסוף, אז שומרים בו את זמן ההתחלה
+        from botocore.utils import determine_content_length
+        # הגוף יכול להיות bytes או קובץ פתוח (למשל ב-put_object), ובשני המקרים אפשר לדעת את האורך
+        sent = determine_content_length(params.get('body') or b'') or 0
+        context['timing'] = {
+            'operation': f"{model.service_model.service_name}.{model.name}",
+            'start': time.perf_counter(),
+            'sent': sent,
+            'streaming': model.has_streaming_output
+        }
+
+    def after_call(self, http_response, parsed, model, context, **kwargs):
+        timing = context.get('timing')
+        if timing is None:
+            return
+        # בתשובה שהיא Stream (כמו get_object) לא קוראים את הגוף כאן, רק את הכותרת
+        # בבקשת HEAD הכותרת content-length מתארת את הקובץ, לא את מה שעבר ברשת
+        received = None if model.http.get('method') == 'HEAD' else http_response.headers.get('content-length')
+        if received is None and not timing['streaming']:
+            received = len(http_response.content or b'')
+        metadata = parsed.get('ResponseMetadata', {})
+        self.record(timing['operation'], timing['start'], status=http_response.status_code,
+                    retries=metadata.get('RetryAttempts', 0), sent=timing['sent'], received=int(received or 0))
+
+    def after_call_error(self, exception, context, **kwargs):
+        # שגיאת רשת (לא תשובה מאמזון) - נרשמת עם סטטוס 0
+        timing = context.get('timing')
+        if timing is not None:
+            self.record(timing['operation'], timing['start'], status=0, sent=timing['sent'])
+
+    def record(self, operation, start, status=200, retries=0, sent=0, received=0):
+        """Adds one finished call (or local step such as client creation)"""
+        with self.lock:
+            self.calls.append({
+                'operation': operation,
+                'start': start - self.origin,
+                'duration': time.perf_counter() - start,
+                'status': status,
+                'retries': retries,
+                'sent': sent,
+                'received': received,
+                'thread': threading.get_ident()
+            })
+
+    def summary(self):
+        """Prints a per-operation table to stderr"""
+        totals = {}
+        for call in self.calls:
+            entry = totals.setdefault(call['operation'], {'calls': 0, 'total': 0, 'max': 0, 'retries': 0,
+                                                          'errors': 0, 'sent': 0, 'received': 0})
+            entry['calls'] += 1
+            entry['total'] += call['duration']
+            entry['max'] = max(entry['max'], call['duration'])
+            entry['retries'] += call['retries']
+            entry['errors'] += call['status'] == 0 or call['status'] >= 300
+            entry['sent'] += call['sent']
+            entry['received'] += call['received']
+
+        print(f"\n{'OPERATION':40} {'CALLS':>6} {'TOTAL s':>9} {'AVG ms':>8} {'MAX ms':>8} "
+              f"{'RETRIES':>7} {'ERRORS':>6} {'SENT KB':>9} {'RECV KB':>9}", file=sys.stderr)
+        # הפעולות שלקחו הכי הרבה זמן מופיעות ראשונות
+        for operation, entry in sorted(totals.items(), key=lambda item: -item[1]['total']):
+            print(f"{operation:40} {entry['calls']:6} {entry['total']:9.3f} "
+                  f"{entry['total'] * 1000 / entry['calls']:8.1f} {entry['max'] * 1000:8.1f} "
+                  f"{entry['retries']:7} {entry['errors']:6} {entry['sent'] / 1024:9.1f} "
+                  f"{entry['received'] / 1024:9.1f}", file=sys.stderr)
+        print(f"Wall time: {time.perf_counter() - self.origin:.3f}s", file=sys.stderr)
+
+    def write_trace(self, path):
+        """Writes the calls as a Chrome trace file (chrome://tracing, Perfetto)"""
+        events = [{
+            'name': call['operation'],
+            'ph': 'X',
+            'ts': round(call['start'] * 1e6),
+            'dur': round(call['duration'] * 1e6),
+            'pid': os.getpid(),
+            'tid': call['thread'],
+            'args': {key: call[key] for key in ('status', 'retries', 'sent', 'received')}
+        } for call in self.calls]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+# כשהמשתמש מבקש --timings או --trace-file, כאן נשמר האובייקט שאוסף את המדידות
+api_timings = None
+
+
+# Session אחת לכל התהליך, ו-Client אחד לכל שירות ו-Region (ה-Clients בטוחים לשימוש מכמה Threads)
+_session = None
+_clients = {}
+_clients_lock = threading.Lock()
+# ServiceLimiter לכל שירות ו-Region. נשמרים גם כשה-Clients נבנים מחדש (למשל ב---timings)
+_limiters = {}
+
+
+def get_session():
+    """Returns the process wide boto3 session"""
+    global _session
+    with _clients_lock:
+        if _session is None:
+            # boto3 (ו-botocore) נטענים רק כשפקודה באמת צריכה לדבר עם אמזון.
+            # כך --help או שגיאת שימוש לא משלמים על זמן הטעינה שלהם
+            import boto3
+            _session = boto3.session.Session()
+        return _session
+
+
+def get_client(service, region=None):
+    """Returns a shared client for a service and region (None = default region)"""
+    session = get_session()
+    # יצירת Client מתוך Session לא בטוחה מכמה Threads, אז יוצרים תחת נעילה
+    with _clients_lock:
+        if (service, region) not in _clients:
+            from botocore.config import Config
+            started = time.perf_counter()
+            client = session.client(service, region_name=region, config=Config(
+                retries={'mode': API_CONFIG['RETRY_MODE'], 'max_attempts': API_CONFIG['MAX_ATTEMPTS']},
+                max_pool_connections=API_CONFIG['MAX_POOL_CONNECTIONS']))
+            # מגבלה אחת לכל שירות (ו-Region) - משותפת לכל ה-Clients, ה-Threads והפקודות בתהליך.
+            # המפתח הוא ה-Region שה-Client באמת עובד מולו, כך ש-None (ברירת המחדל) ו-us-east-1
+            # מקבלים את אותה מגבלה ולא שתיים נפרדות
+            limiter_key = (service, client.meta.region_name)
+            if limiter_key not in _limiters:
+                _limiters[limiter_key] = ServiceLimiter(rate_limits().get(service))
+            _limiters[limiter_key].register(client)
+            _clients[(service, region)] = client
+            # גם בניית ה-Client לוקחת זמן (טעינת מודל השירות ו-Endpoint), אז מודדים גם אותה
+            if api_timings:
+                api_timings.record(f'client.create {service}', started)
+        return _clients[(service, region)]
+
+
+def resolve_regions(value):
+    """Turns a --regions value (comma separated or 'all') into a list of regions"""
+    if not value:
+        return []
+    if value == 'all':
+        # כל ה-Regions שפעילים בחשבון
+        response = get_client('ec2').describe_regions()
+        return sorted(region['RegionName'] for region in response['Regions'])
+    return [region.strip() for region in value.split(',') if region.strip()]
+
+
+class RegionError(Exception):
+    """Raised by iter_regions after all regions ran, when at least one of them failed"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} region(s) failed: " +
+                         '; '.join(f"{region}: {describe_error(error)}" for region, error in errors.items()))
+
+
+def iter_regions(regions, fetch, failed=None):
+    """Runs fetch(region) in all regions at once and yields (region, item) as items arrive.
+
+    Regions that fail are put in the `failed` dict ({region: error}) if one is given,
+    otherwise a RegionError is raised once all the other regions are done.
+    """
+    # תור חסום - ה-Threads מחכים אם הצרכן (ההדפסה) לא עומד בקצב, וכך הזיכרון לא גדל
+    results = queue.Queue(maxsize=1000)
+    stats = {}
+
+    # מסמן ל-Threads להפסיק - למשל אם הצרכן הפסיק לקרוא (| head, Ctrl-C או שגיאה בהדפסה)
+    stopped = threading.Event()
+
+    # מכניס לתור, אבל לא נתקע לנצח על תור מלא אם כבר אין מי שיקרא ממנו
+    def put(entry):
+        while not stopped.is_set():
+            try:
+                results.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # פונקציה שרצה ב-Thread לכל Region ומעבירה כל תוצאה לתור ברגע שהיא מגיעה
+    def worker(region):
+        started = time.monotonic()
+        count = 0
+        error = None
+        try:
+            for item in fetch(region):
+                if not put((region, item, False)):
+                    return
+                count += 1
+        except Exception as e:
+            # שגיאה ב-Region אחד לא מפילה את כל הריצה
+            error = e
+        stats[region] = (time.monotonic() - started, count, error)
+        put((region, None, True))
+
+    pool = ThreadPool(max_workers=min(len(regions), 16) or 1)
+    futures = [pool.submit(worker, region) for region in regions]
+    try:
+        remaining = len(regions)
+        while remaining:
+            region, item, finished = results.get()
+            if finished:
+                remaining -= 1
+            else:
+                yield region, item
+    finally:
+        # גם כשהצרכן עוצר באמצע: ה-Threads רואים את הדגל ויוצאים, ולא מחכים להם כאן
+        stopped.set()
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+    # סיכום לכל Region: כמה זמן לקח, כמה תוצאות, ואם הייתה שגיאה
+    for region in regions:
+        elapsed, count, error = stats[region]
+        status = f"ERROR {describe_error(error)}" if error else f"{count} items"
+        print(f"{region}: {status} in {elapsed:.2f}s", file=sys.stderr)
+
+    # מי שקרא לנו חייב לדעת אם Region נכשל - אחרת "אין משאבים" ו"לא הצלחנו לבדוק" נראים אותו דבר
+    errors = {region: stats[region][2] for region in regions if stats[region][2]}
+    if failed is not None:
+        failed.update(errors)
+    elif errors:
+        raise RegionError(errors)
+
+
+def paginate(client, operation, **kwargs):
+    """Yields every page of a paginated AWS operation"""
+    # ה-Paginator של boto3 מביא את הדף הבא רק כשמבקשים אותו (וכל דף עובר דרך ה-ServiceLimiter)
+    yield from client.get_paginator(operation).paginate(**kwargs)
+
+
 # מגדיר את הפונקציה הבאה כקבוצת הפקודות הראשית של הכלי (ה"גזע" של העץ)
 @click.group()
+# אופציות גלובליות למדידת זמנים של כל קריאה לאמזון
+@click.option('--timings', is_flag=True, help='Print a per-API-call timing summary at exit')
+@click.option('--trace-file', type=click.Path(dir_okay=False), help='Write a Chrome trace (JSON) of all API calls')
+@click.pass_context
 # פונקציית הבסיס של ה-CLI, היא לא עושה כלום בעצמה אלא רק מאגדת את הפקודות האחרות
-def cli():
+def cli(ctx, timings, trace_file):
     """My Tool"""
-    # פקודה שאומרת לפייתון "אל תעשה כלום", נדרשת כי פונקציה לא יכולה להיות ריקה
-    pass
+    global api_timings
+    if not (timings or trace_file):
+        return
+    # המדידה נרשמת על ה-Session המשותפת של כל התהליך - בתוך serve או batch היא הייתה מערבבת פקודות אחרות
+    if _daemon_request.get() is not None:
+        raise click.UsageError('--timings and --trace-file can only be used in a local run, not inside serve or batch.')
+    # רושמים את ה-Hooks על ה-Session המשותפת לפני שנוצר ה-Client הראשון
+    api_timings = ApiTimings()
+    api_timings.register(get_session())
+    # Clients שכבר נוצרו לא מכירים את ה-Hooks החדשים, אז בונים אותם מחדש
+    with _clients_lock:
+        _clients.clear()
+
+    # בסוף הריצה (גם אם הפקודה נכשלה) מדפיסים את הסיכום וכותבים את הקובץ
+    def report():
+        if timings:
+            api_timings.summary()
+        if trace_file:
+            api_timings.write_trace(trace_file)
+            print(f"Trace written to {trace_file}", file=sys.stderr)
+
+    ctx.call_on_close(report)
 
 
 # מגדיר את הפונקציה הבאה כתת-קבוצה תחת cli, שתרכז את כל פקודות ה-EC2
@@ -80,44 +759,140 @@ def ec2():
     pass
 
 
+def get_tag(resource, key, default=''):
+    """Returns the value of one tag from an AWS resource description"""
+    for tag in resource.get('Tags', []):
+        if tag['Key'] == key:
+            return tag['Value']
+    return default
+
+
+# העמודות שאפשר להציג ב-ec2 list, וכיצד מחלצים כל אחת מתיאור השרת שאמזון מחזירה
+EC2_COLUMNS = {
+    'id': lambda instance: instance['InstanceId'],
+    'name': lambda instance: get_tag(instance, 'Name'),
+    'state': lambda instance: instance['State']['Name'],
+    'type': lambda instance: instance['InstanceType'],
+    'owner': lambda instance: get_tag(instance, 'Owner'),
+    'launch_time': lambda instance: instance['LaunchTime'].isoformat(),
+}
+
+
+def iter_my_instances(ec2_client, states=None, types=None, owner=None, instance_ids=None, tags=None):
+    """Yields instances created by this CLI, page by page"""
+    # כל הסינון נעשה בצד של אמזון, כך שרק השרתים הרלוונטיים עוברים ברשת
+    filters = [
+        CLI_ID_TAG,
+        # ברירת המחדל היא לא להציג שרתים שכבר נמחקו (terminated)
+        {'Name': 'instance-state-name', 'Values': list(states or EC2_CONFIG['ACTIVE_STATES'])}
+    ]
+    if types:
+        filters.append({'Name': 'instance-type', 'Values': list(types)})
+    if owner:
+        filters.append({'Name': 'tag:Owner', 'Values': [owner]})
+    # סינון לפי ID כ-Filter (ולא InstanceIds) - כך ID שלא קיים פשוט לא יחזור, במקום להכשיל את כל הבקשה
+    if instance_ids:
+        filters.append({'Name': 'instance-id', 'Values': list(instance_ids)})
+    for key, value in (tags or {}).items():
+        filters.append({'Name': f'tag:{key}', 'Values': [value]})
+
+    # generator - מחזיר שרת אחד בכל פעם, כך שהזיכרון לא גדל עם כמות השרתים
+    for page in paginate(ec2_client, 'describe_instances', Filters=filters,
+                         PaginationConfig={'PageSize': 1000}):
+        # התשובה מאמזון מגיעה במבנה של "קבוצות" (Reservations), ובתוך כל קבוצה יש את השרתים עצמם
+        for reservation in page['Reservations']:
+            for instance in reservation['Instances']:
+                yield instance
+
+
+def parse_columns(value, available):
+    """Turns a comma separated --columns value into a validated list"""
+    columns = [column.strip() for column in value.split(',') if column.strip()]
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise click.BadParameter(f"unknown columns {', '.join(unknown)} (choose from {', '.join(available)})")
+    return columns
+
+
+def print_rows(rows, columns, output):
+    """Prints dict rows as a table, a JSON array or NDJSON while they arrive"""
+    # מדפיסים כל שורה ברגע שהיא מגיעה, בלי לאסוף את כל התוצאות קודם
+    if output == 'table':
+        print('  '.join(column.upper().ljust(OUTPUT_WIDTHS.get(column, 20)) for column in columns).rstrip())
+        for row in rows:
+            print('  '.join(str(row[column]).ljust(OUTPUT_WIDTHS.get(column, 20)) for column in columns).rstrip())
+    elif output == 'json':
+        # מערך JSON שנכתב איבר אחרי איבר
+        print('[', end='')
+        for index, row in enumerate(rows):
+            print((',\n ' if index else '\n ') + json.dumps(row, default=str), end='')
+        print('\n]')
+    else:
+        for row in rows:
+            print(json.dumps(row, default=str))
+
+
 # מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת EC2
 @ec2.command(name='list')
+# סינונים שנשלחים לאמזון (ולא מתבצעים אצלנו אחרי שהכל כבר ירד)
+@click.option('--state', 'states', multiple=True,
+              type=click.Choice(['pending', 'running', 'stopping', 'stopped', 'shutting-down', 'terminated']),
+              help='Only instances in this state (repeatable, default: all except terminated)')
+@click.option('--type', 'types', multiple=True, help='Only instances of this type (repeatable)')
+@click.option('--owner', help='Only instances with this Owner tag')
+# איך להציג את התוצאה: טבלה לבני אדם, או JSON/NDJSON לכלים אחרים
+@click.option('--output', type=click.Choice(['table', 'json', 'ndjson']), default='table', show_default=True)
+@click.option('--columns', default=','.join(EC2_COLUMNS), show_default=True, help='Comma separated columns to show')
+# רשימת Regions מופרדת בפסיקים, או all לכל ה-Regions בחשבון
+@click.option('--regions', help="Comma separated regions to list, or 'all'")
 # הפונקציה שמבצעת את פעולת ה-List (הצגת השרתים)
-def list_instances():
+def list_instances(states, types, owner, output, columns, regions):
     """List instances created by this CLI"""
-    # יצירת חיבור (Client) שמאפשר לנו לדבר עם שירות ה-EC2
-    ec2_client = boto3.client('ec2')
-
-    # שליחת הבקשה לאמזון: "תביא לי את השרתים, אבל רק אלו שעוברים דרך המסננת שהגדרתי"
-    response = ec2_client.describe_instances(Filters=[CLI_ID_TAG])
-    # התשובה מאמזון מגיעה במבנה של "קבוצות" (Reservations), אז הלולאה הראשונה פותחת את הקבוצות
-    for i in response['Reservations']:
-        # בתוך כל קבוצה יש את השרתים עצמם (Instances), הלולאה השנייה עוברת עליהם אחד אחד
-        for instance in i['Instances']:
-            # הדפסת תעודת הזהות (ID) של השרת למסך
-            print(instance['InstanceId'])
-# פונקציית עזר פנימית שבודקת כמה שרתים כבר קיימים בחשבון שנוצרו ע"י הכלי הזה
+    columns = parse_columns(columns, EC2_COLUMNS)
+    regions = resolve_regions(regions)
+
+    if not regions:
+        # יצירת חיבור (Client) שמאפשר לנו לדבר עם שירות ה-EC2
+        ec2_client = get_client('ec2')
+        # הופך כל שרת לשורה עם העמודות שהמשתמש ביקש בלבד
+        rows = ({column: EC2_COLUMNS[column](instance) for column in columns}
+                for instance in iter_my_instances(ec2_client, states, types, owner))
+        # גם אחרי ה-Retries אמזון יכולה להמשיך להגביל אותנו - מדווחים כמו בשאר הפקודות ולא עם Traceback
+        try:
+            print_rows(rows, columns, output)
+        except Exception as e:
+            raise click.ClickException(f"Could not list instances: {describe_error(e)}")
+        return
 
+    # כמה Regions - כולם רצים במקביל, והתוצאות מתמזגות לרשימה אחת עם עמודת Region
+    def fetch(region):
+        return iter_my_instances(get_client('ec2', region), states, types, owner)
+
+    failed = {}
+    rows = ({'region': region, **{column: EC2_COLUMNS[column](instance) for column in columns}}
+            for region, instance in iter_regions(regions, fetch, failed))
+    print_rows(rows, ['region'] + columns, output)
+    # הפלט של ה-Regions שהצליחו כבר הודפס במלואו, אבל הרשימה לא שלמה
+    if failed:
+        print(f"Error: Could not list {len(failed)} region(s): {', '.join(sorted(failed))}", file=sys.stderr)
+        sys.exit(1)
+
+
+# פונקציית עזר פנימית שבודקת כמה שרתים כבר קיימים בחשבון שנוצרו ע"י הכלי הזה
 def count_my_instances():
     """Returns the number of instances created by this CLI"""
     # יוצר חיבור (Client) לשירות EC2 של אמזון לצורך ביצוע הבדיקה
-    ec2_client = boto3.client('ec2')
+    ec2_client = get_client('ec2')
 
-    # מגדיר את תנאי הסינון: חפש רק שרתים שיש להם תגית CreatedBy עם הערך platform-cli
-    # (שים לב: תיקנתי כאן את הגרשיים המיותרים שהיו בתוך השם של התגית)
-    # שולח בקשה לאמזון לקבל רק את השרתים שעומדים בתנאי הסינון שהגדרנו למעלה
-    response = ec2_client.describe_instances(Filters=[CLI_ID_TAG])
-    # מאתחל משתנה ספירה ב-0
-    count = 0
+    # סופר את השרתים שלנו (בלי אלו שכבר נמחקו) בלי לשמור אותם בזיכרון
+    return sum(1 for _ in iter_my_instances(ec2_client))
 
-    # מתחיל לולאה שעוברת על התשובה שחזרה מאמזון כדי לספור את התוצאות
-    for i in response['Reservations']:
-        # עובר על כל שרת שנמצא בתוך רשימת השרתים שחזרה
-        for instance in i['Instances']:
-            count = count + 1
 
-    # מחזיר את המספר הסופי של השרתים שנמצאו לפונקציה שקראה לי
-    return count
+# אופציות משותפות ל-create/stop/start/terminate: לחכות עד שהשרתים יגיעו למצב הסופי
+def wait_options(command):
+    command = click.option('--timeout', default=600, show_default=True, help='Seconds to wait with --wait')(command)
+    command = click.option('--wait', 'wait_state', is_flag=True, help='Wait until the instances reach their final state')(command)
+    return command
 
 
 # מגדיר את הפונקציה הבאה כפקודה ביצועית נוספת תחת קבוצת EC2
@@ -126,13 +901,20 @@ def count_my_instances():
 @click.option('--name', required=True, help='Name of the instance')
 # מגדיר פרמטר אופציונלי לבחירת סוג מערכת ההפעלה, עם ערך ברירת מחדל 'amazon'
 @click.option('--os_type', default='amazon', help='OS type: amazon or ubuntu')
+# סוג השרת - רק מתוך הרשימה המותרת ב-Config
+@click.option('--type', 'instance_type', type=click.Choice(EC2_CONFIG['ALLOWED_TYPES']),
+              default=EC2_CONFIG['ALLOWED_TYPES'][0], show_default=True, help='Instance type')
+# כמה שרתים ליצור בבת אחת (בקריאה אחת לאמזון)
+@click.option('--count', default=1, show_default=True, type=click.IntRange(min=1), help='Number of instances to create')
+@wait_options
 # הפונקציה שיוצרת את השרת, מקבלת את הפרמטרים שהוגדרו למעלה
-def create(name, os_type):
-    """Create a new EC2 instance"""
+def create(name, os_type, instance_type, count, wait_state, timeout):
+    """Create new EC2 instances"""
 
-    # קורא לפונקציית העזר שלנו כדי לבדוק אם הגענו כבר למכסה המקסימלית של 2 שרתים
-    if count_my_instances() >= 2:
-        print("Error: Limit reached!")
+    # קורא לפונקציית העזר שלנו פעם אחת בלבד, ובודק שכל השרתים החדשים ייכנסו במכסה
+    existing = count_my_instances()
+    if existing + count > EC2_CONFIG['MAX_INSTANCES']:
+        print(f"Error: Limit reached! {existing} of {EC2_CONFIG['MAX_INSTANCES']} instances already exist.")
         # עוצר את ריצת הפונקציה כאן ויוצא החוצה (כדי למנוע את יצירת השרת)
         return
     # משתמש בפונקציית העזר כדי להכין את התגיות (משלב גלובליות + שם השרת)
@@ -140,17 +922,16 @@ def create(name, os_type):
     # שולף את ה-ID של התמונה (AMI) מתוך הקובץ הגדרות למעלה, לפי מה שהמשתמש בחר
     ami_id = EC2_CONFIG['AMI_MAP'][os_type]
     # יוצר חיבור (Client) לשירות EC2 של אמזון
-    ec2_client = boto3.client('ec2')
+    ec2_client = get_client('ec2')
     #
-    ec2_client.run_instances(
+    response = ec2_client.run_instances(
         # הפרמטר שמגדיר איזו מערכת הפעלה להתקין (לפי ה-ID ששלפנו קודם)
         ImageId=ami_id,
-        # הפרמטר שמגדיר את עוצמת השרת (מעבד וזיכרון) - כרגע קבוע בקוד
-        InstanceType='t3.micro',
-        # מגדיר את מינימום השרתים ליצירה (חובה שיהיה לפחות 1)
-        MinCount=1,
-        # מגדיר את מקסימום השרתים ליצירה (כדי להבטיח שנוצר בדיוק שרת אחד)
-        MaxCount=1,
+        # הפרמטר שמגדיר את עוצמת השרת (מעבד וזיכרון) - מתוך הסוגים המותרים
+        InstanceType=instance_type,
+        # מבקשים את כל השרתים בקריאה אחת. Min=Max כדי לקבל בדיוק את הכמות או כלום
+        MinCount=count,
+        MaxCount=count,
         # מעביר לאמזון את רשימת התגיות שיצרנו, כדי שיודבקו על השרת
         TagSpecifications=[
             {
@@ -162,48 +943,238 @@ def create(name, os_type):
         ]
     )
 
-    print("Instance created successfully!")
+    # השרתים החדשים בוודאות שלנו - שומרים את זה במטמון כדי שה-stop לא יצטרך לבדוק שוב
+    ownership_cache.put_many('ec2', {instance['InstanceId']: True for instance in response['Instances']})
+    for instance in response['Instances']:
+        print(instance['InstanceId'])
+    # ומוסיפים אותם לאינדקס המקומי, כך ש-inventory query יראה אותם מיד
+    tags = {tag['Key']: tag['Value'] for tag in tag_specifications}
+    write_through(lambda: inventory_index.upsert(
+        [instance_row(instance, ec2_client.meta.region_name, tags) for instance in response['Instances']]))
+
+    print(f"{len(response['Instances'])} instance(s) created successfully!")
+
+    # --wait: מחכים שכל השרתים החדשים יגיעו ל-running (בקריאה אחת לכל סבב)
+    if wait_state:
+        instance_ids = [instance['InstanceId'] for instance in response['Instances']]
+        if not report_watch(watch_instances(ec2_client, instance_ids, 'running', timeout), len(instance_ids), 'running'):
+            sys.exit(1)
+
+
+def parse_tag_selector(values, param_hint='--tag'):
+    """Turns repeated --tag Key=Value options into a dict"""
+    tags = {}
+    for value in values:
+        key, separator, tag_value = value.partition('=')
+        if not separator or not key:
+            raise click.BadParameter(f"'{value}' is not in Key=Value format", param_hint=param_hint)
+        tags[key] = tag_value
+    return tags
+
+
+def resolve_my_instances(ec2_client, instance_ids, tags):
+    """Returns (owned ids, rejected ids) for the requested instances"""
+    # שרתים שנבחרו לפי תגיות - שאילתה אחת שמחזירה רק שרתים שלנו
+    if tags:
+        owned = [instance['InstanceId'] for instance in iter_my_instances(ec2_client, tags=tags, instance_ids=instance_ids)]
+        rejected = sorted(set(instance_ids) - set(owned))
+        return owned, rejected
+
+    # קודם בודקים במטמון (שאילתה אחת לכולם) - מה שכבר ידוע לא צריך לעבור שוב מול אמזון
+    cached = ownership_cache.get_many('ec2', instance_ids)
+    owned = [instance_id for instance_id in instance_ids if cached.get(instance_id)]
+    rejected = [instance_id for instance_id in instance_ids if cached.get(instance_id) is False]
+    unknown = [instance_id for instance_id in instance_ids if instance_id not in cached]
+
+    # כל השאר נבדקים ביחד, בקריאת describe אחת לכל 1000 שרתים
+    for batch in chunks(unknown, 1000):
+        found = {instance['InstanceId'] for instance in iter_my_instances(ec2_client, instance_ids=batch)}
+        answers = {instance_id: instance_id in found for instance_id in batch}
+        ownership_cache.put_many('ec2', answers)
+        for instance_id, is_ours in answers.items():
+            (owned if is_ours else rejected).append(instance_id)
+    return owned, rejected
+
+
+# איך להציג כל פעולה בהודעות למשתמש
+ACTION_VERBS = {'stop': 'Stopping', 'start': 'Starting', 'terminate': 'Terminating'}
+# המצב שהשרת עובר אליו מיד אחרי כל פעולה (נשמר באינדקס המקומי)
+ACTION_STATES = {'stop': 'stopping', 'start': 'pending', 'terminate': 'shutting-down'}
+# המצב הסופי שמחכים לו ב---wait
+ACTION_TARGETS = {'stop': 'stopped', 'start': 'running', 'terminate': 'terminated'}
+
+
+def print_state_event(instance_id, previous, state, output):
+    """Prints one instance state change as a text line or an NDJSON object"""
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    # flush - כדי שמי שקורא את הפלט דרך pipe יראה כל שינוי ברגע שהוא קורה
+    if output == 'ndjson':
+        print(json.dumps({'time': now, 'instance_id': instance_id, 'previous': previous, 'state': state}), flush=True)
+    else:
+        print(f"{now} {instance_id}: {previous or '-'} -> {state}", flush=True)
+
+
+def watch_instances(ec2_client, instance_ids, target_state, timeout, output='text'):
+    """Polls all the instances together until they reach target_state; returns the ones that did not"""
+    pending = set(instance_ids)
+    last_states = {}
+    deadline = time.monotonic() + timeout
+    delay = EC2_CONFIG['WATCH_MIN_DELAY']
+    while True:
+        changed = {}
+        # קריאת describe אחת לכל 1000 שרתים בכל סבב (ולא קריאה לכל שרת)
+        for batch in chunks(sorted(pending), 1000):
+            for instance in iter_my_instances(ec2_client, EC2_CONFIG['ACTIVE_STATES'] + ['terminated'], instance_ids=batch):
+                instance_id = instance['InstanceId']
+                state = instance['State']['Name']
+                if last_states.get(instance_id) != state:
+                    print_state_event(instance_id, last_states.get(instance_id), state, output)
+                    last_states[instance_id] = state
+                    changed[instance_id] = state
+                # שרת שנמחק כבר לא יגיע לשום מצב אחר - מפסיקים לחכות לו
+                if state == target_state or state == 'terminated':
+                    pending.discard(instance_id)
+
+        # מעדכנים את האינדקס המקומי במצבים החדשים
+        for state in set(changed.values()):
+            ids = [instance_id for instance_id, new_state in changed.items() if new_state == state]
+            write_through(lambda: inventory_index.set_state('ec2', ids, state))
+
+        now = time.monotonic()
+        if not pending or now >= deadline:
+            break
+        # לא מוותרים לפני הזמן: ישנים רק עד ה-deadline, ואז בודקים פעם אחרונה
+        time.sleep(min(delay, deadline - now))
+        # כל עוד שרתים משנים מצב בודקים לעתים קרובות, וכשהכל "נרגע" מאריכים את ההמתנה
+        delay = EC2_CONFIG['WATCH_MIN_DELAY'] if changed else min(delay * 1.5, EC2_CONFIG['WATCH_MAX_DELAY'])
+    return sorted(instance_id for instance_id in instance_ids if last_states.get(instance_id) != target_state)
+
+
+def report_watch(not_ready, total, target_state, file=None):
+    """Prints the result of watch_instances; returns False if some instances did not make it"""
+    if not not_ready:
+        print(f"All {total} instance(s) are {target_state}.", file=file)
+        return True
+    print(f"Error: {len(not_ready)} instance(s) did not reach {target_state}: {' '.join(not_ready)}", file=file)
+    return False
+
+
+def change_instance_state(action, instance_ids, tag_values, wait_state=False, timeout=600):
+    """Verifies ownership of many instances and then stops/starts/terminates them in bulk"""
+    tags = parse_tag_selector(tag_values)
+    if not instance_ids and not tags:
+        raise click.UsageError('Give at least one --instance_id or --tag selector.')
+
+    # יצירת חיבור ל-EC2 כדי שנוכל לשלוח פקודות לאמזון
+    ec2_client = get_client('ec2')
+    print(f"Checking permission for {len(instance_ids) or 'tagged'} instance(s)...")
+    try:
+        owned, rejected = resolve_my_instances(ec2_client, instance_ids, tags)
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        return
+
+    # שרת שלא חזר מהבדיקה הוא או לא קיים, או שלא נוצר ע"י הכלי - ואסור לגעת בו
+    for instance_id in rejected:
+        print(f"Access Denied: {instance_id} was not found or was not created by platform-cli.")
+    if not owned:
+        print("No instances to act on.")
+        return
+
+    # שולחים את הפקודה לאמזון בקבוצות, קריאה אחת לכל קבוצה
+    operation = getattr(ec2_client, f'{action}_instances')
+    sent = []
+    for batch in chunks(owned, EC2_CONFIG['ACTION_BATCH_SIZE']):
+        print(f"{ACTION_VERBS[action]} {len(batch)} instance(s): {' '.join(batch)}")
+        try:
+            operation(InstanceIds=batch)
+        except Exception as e:
+            # אם התשובה מהמטמון כבר לא נכונה (למשל השרת נמחק), שהפעם הבאה תבדוק מול אמזון
+            ownership_cache.forget_many('ec2', batch)
+            print(f"Error: {describe_error(e)}")
+            return
+        # מעדכנים את המצב באינדקס המקומי
+        write_through(lambda: inventory_index.set_state('ec2', batch, ACTION_STATES[action]))
+        sent.extend(batch)
+
+    print(f"{action.capitalize()} command sent successfully.")
+
+    # --wait: מחכים שכל השרתים יגיעו למצב הסופי (stopped/running/terminated)
+    if wait_state:
+        target_state = ACTION_TARGETS[action]
+        if not report_watch(watch_instances(ec2_client, sent, target_state, timeout), len(sent), target_state):
+            sys.exit(1)
+
+
+# אופציות משותפות ל-stop/start/terminate: רשימת IDs או בחירה לפי תגיות
+def instance_selector_options(command):
+    command = click.option('--tag', 'tag_values', multiple=True,
+                           help='Select instances by tag, Key=Value (repeatable)')(command)
+    command = click.option('--instance_id', 'instance_ids', multiple=True,
+                           help='ID of an instance (repeatable)')(command)
+    return command
 
 
 # מגדיר את הפונקציה הבאה כפקודה תחת קבוצת EC2
 @ec2.command()
-# המשתמש חייב לספק את ה-ID של השרת שהוא רוצה לעצור
-@click.option('--instance_id', required=True, help='ID of the instance to stop')
-# הפונקציה שמבצעת את עצירת השרת בפועל, מקבלת את ה-ID כפרמטר
-def stop(instance_id):
-    """Stop an EC2 instance (only if created by this CLI)"""
-    # יצירת חיבור ל-EC2 כדי שנוכל לשלוח פקודות לאמזון
-    ec2_client = boto3.client('ec2')
+@instance_selector_options
+@wait_options
+# הפונקציה שמבצעת את עצירת השרתים בפועל
+def stop(instance_ids, tag_values, wait_state, timeout):
+    """Stop EC2 instances (only if created by this CLI)"""
+    change_instance_state('stop', instance_ids, tag_values, wait_state, timeout)
 
-    print(f"Checking permission for {instance_id}...")
 
-    # מתחילים בלוק "ניסיון" (try) כדי למנוע מהתוכנה לקרוס אם המשתמש הזין ID שלא קיים בכלל
-    try:
-        # אנחנו מנסים לשלוף את השרת הספציפי הזה, אבל *רק* אם יש לו את התגית הנכונה
-        response = ec2_client.describe_instances(
-            # מגדיר שאנחנו מחפשים מידע ספציפית על ה-ID שהמשתמש הקליד
-            InstanceIds=[instance_id],
-            # מוסיף תנאי קריטי: תביא את השרת הזה *רק* אם יש לו את התגית שלנו (CreatedBy)
-            Filters=[CLI_ID_TAG]
-        )
-    # אם ה-boto3 נכשל (למשל כי ה-ID לא תקין או לא קיים), הקוד יגיע לכאן במקום לקרוס
-    except:
-        # אם ה-ID לא קיים בכלל באמזון, הקוד יקפוץ לכאן
-        print("Error: Instance ID not found.")
-        return
+@ec2.command()
+@instance_selector_options
+@wait_options
+def start(instance_ids, tag_values, wait_state, timeout):
+    """Start EC2 instances (only if created by this CLI)"""
+    change_instance_state('start', instance_ids, tag_values, wait_state, timeout)
+
 
-    # אם אמזון החזירה רשימה ריקה, זה אומר שהשרת קיים (כי ה-try עבר), אבל אין לו את התגית שלנו (הפילטר סינן אותו)
-    if len(response['Reservations']) == 0:
-        print("Access Denied: This instance was not created by platform-cli.")
+@ec2.command()
+@instance_selector_options
+@wait_options
+# מחיקה של שרת היא סופית, אז מבקשים אישור (אפשר לדלג עם --yes)
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation')
+def terminate(instance_ids, tag_values, wait_state, timeout, yes):
+    """Terminate EC2 instances (only if created by this CLI)"""
+    if not yes and not click.confirm('WARNING: Terminated instances cannot be recovered. Are you sure?', default=False):
+        print('Aborted!')
         return
+    change_instance_state('terminate', instance_ids, tag_values, wait_state, timeout)
 
-    # אם הגענו לכאן - השרת הוא שלנו ומותר לעצור אותו!
-    print(f"Stopping instance {instance_id}...")
 
-    # שולח את פקודת העצירה הסופית לאמזון עבור ה-ID שאימתנו
-    ec2_client.stop_instances(InstanceIds=[instance_id])
+@ec2.command()
+@instance_selector_options
+@click.option('--state', 'target_state', default='running', show_default=True,
+              type=click.Choice(EC2_CONFIG['ACTIVE_STATES'] + ['terminated']), help='The state to wait for')
+@click.option('--timeout', default=600, show_default=True, help='Seconds to wait before giving up')
+@click.option('--output', type=click.Choice(['text', 'ndjson']), default='text', show_default=True,
+              help='How to print each state change')
+# הפונקציה שעוקבת אחרי הרבה שרתים ביחד עד שכולם מגיעים למצב המבוקש
+def watch(instance_ids, tag_values, target_state, timeout, output):
+    """Watch instances until they all reach a state (only if created by this CLI)"""
+    tags = parse_tag_selector(tag_values)
+    if not instance_ids and not tags:
+        raise click.UsageError('Give at least one --instance_id or --tag selector.')
+    ec2_client = get_client('ec2')
+    try:
+        owned, rejected = resolve_my_instances(ec2_client, instance_ids, tags)
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        sys.exit(1)
+    for instance_id in rejected:
+        print(f"Access Denied: {instance_id} was not found or was not created by platform-cli.", file=sys.stderr)
+    if not owned:
+        print("No instances to watch.", file=sys.stderr)
+        sys.exit(1)
 
-    print("Stop command sent successfully.")
+    not_ready = watch_instances(ec2_client, owned, target_state, timeout, output)
+    # בפורמט NDJSON ה-stdout נשאר רק לאירועים, אז הסיכום הולך ל-stderr
+    if not report_watch(not_ready, len(owned), target_state, file=sys.stderr):
+        sys.exit(1)
 
 
 # מגדיר את הפונקציה הבאה כתת-קבוצה תחת cli, שתרכז את כל פקודות ה-S3
@@ -215,6 +1186,135 @@ def s3():
     pass
 
 
+def read_bucket_manifest(stream, file_format, default_access, extra_tags):
+    """Returns the buckets of a CSV, JSON or NDJSON manifest as dicts (name, access, tags)"""
+    # כל שגיאה מציינת את הקובץ ואת מספר הדלי בתוכו (ב-NDJSON - מספר השורה)
+    manifest = getattr(stream, 'name', 'manifest')
+    if file_format == 'csv':
+        rows = enumerate(csv.DictReader(stream), start=1)
+    elif file_format == 'json':
+        try:
+            data = json.load(stream)
+        except ValueError as e:
+            raise click.ClickException(f"{manifest}: invalid JSON: {e}")
+        # מקבלים גם רשימה פשוטה וגם אובייקט עם מפתח buckets
+        if isinstance(data, dict):
+            data = data.get('buckets')
+        if not isinstance(data, list):
+            raise click.ClickException(f"{manifest}: expected a list of buckets or an object with a 'buckets' list")
+        rows = enumerate(data, start=1)
+    else:
+        rows = read_ndjson_rows(stream, label=f"{manifest}: Bucket")
+
+    buckets = []
+    names = set()
+    for line_number, row in rows:
+        where = f"{manifest}: Bucket {line_number}"
+        if not isinstance(row, dict):
+            raise click.ClickException(f"{where}: expected an object, got {json.dumps(row)}")
+        name = row.get('name') or ''
+        if not isinstance(name, str) or not name.strip():
+            raise click.ClickException(f"{where}: missing name")
+        name = name.strip()
+        if name in names:
+            raise click.ClickException(f"{where}: {name} appears more than once")
+        names.add(name)
+        access = row.get('access') or default_access
+        if not isinstance(access, str) or access.lower() not in ('public', 'private'):
+            raise click.ClickException(f"{where}: unknown access '{access}'")
+        access = access.lower()
+        # ב-CSV התגיות הן Key=Value מופרדים עם |, וב-JSON אפשר גם אובייקט רגיל
+        tags = row.get('tags') or {}
+        if isinstance(tags, str):
+            try:
+                tags = parse_tag_selector([tag for tag in tags.split('|') if tag],
+                                          param_hint=f"tags of bucket {line_number} in {manifest}")
+            except click.BadParameter as e:
+                raise click.ClickException(e.format_message())
+        if not isinstance(tags, dict):
+            raise click.ClickException(f"{where}: tags must be an object or Key=Value|Key=Value, got {json.dumps(tags)}")
+        tags = {**extra_tags, **{str(key): str(value) for key, value in tags.items()}}
+        buckets.append({'name': name, 'access': access, 'tags': tags})
+    return buckets
+
+
+def create_bucket_step(s3_client, step, bucket):
+    """Runs one provisioning step (create, encrypt or tag) for a bucket of the manifest"""
+    name = bucket['name']
+    if step == 'create':
+        location = S3_CONFIG['Location']
+        # ב-us-east-1 אמזון מחזירה "הצלחה" גם על דלי שכבר קיים אצלנו בחשבון.
+        # בודקים קודם, כדי לא לתייג (ובכישלון - למחוק) דלי שלא אנחנו יצרנו
+        if location == 'us-east-1':
+            try:
+                s3_client.head_bucket(Bucket=name)
+            except Exception as e:
+                if (getattr(e, 'response', None) or {}).get('Error', {}).get('Code') not in ('404', 'NoSuchBucket'):
+                    raise
+            else:
+                raise click.ClickException('the bucket already exists in this account')
+            s3_client.create_bucket(Bucket=name)
+        else:
+            # בכל Region אחר חייבים להגיד לאמזון איפה ליצור את הדלי
+            s3_client.create_bucket(Bucket=name, CreateBucketConfiguration={'LocationConstraint': location})
+    elif step == 'encrypt':
+        # מוסיף את הגדרות ההצפנה (AES256) לדלי שיצרנו - חובה לפי הדרישות
+        s3_client.put_bucket_encryption(Bucket=name, ServerSideEncryptionConfiguration=S3_CONFIG['Encryption'])
+    else:
+        # מוסיף את התגיות לדלי (כי הפקודה create_bucket לא תומכת בזה)
+        s3_client.put_bucket_tagging(Bucket=name, Tagging={'TagSet': get_aws_tags(bucket['tags'])})
+
+
+BUCKET_STEPS = ['create', 'encrypt', 'tag']
+
+
+def create_buckets(buckets, workers):
+    """Creates, encrypts and tags buckets as a pipeline; rolls back buckets whose later step failed"""
+    s3_client = get_client('s3', S3_CONFIG['Location'])
+    created = []
+    failed = 0
+
+    def roll_back(bucket):
+        # הדלי נוצר רק עכשיו ועדיין ריק, אז אפשר פשוט למחוק אותו
+        try:
+            s3_client.delete_bucket(Bucket=bucket['name'])
+        except Exception as e:
+            return f"and could not be rolled back ({describe_error(e)}) - delete it by hand"
+        return "and was rolled back"
+
+    # כל צעד הוא משימה נפרדת ב-Pool: כשצעד של דלי מסתיים שולחים מיד את הצעד הבא שלו,
+    # ככה דליים שונים נמצאים בו זמנית בשלבים שונים ואף Thread לא מחכה לדלי אחד
+    with ThreadPool(max_workers=workers) as pool:
+        pending = {pool.submit(create_bucket_step, s3_client, BUCKET_STEPS[0], bucket): (bucket, 0) for bucket in buckets}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                bucket, step_index = pending.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    message = f"Error: {bucket['name']}: {BUCKET_STEPS[step_index]} failed: {describe_error(e)}"
+                    if step_index > 0:
+                        message += f" {roll_back(bucket)}"
+                    print(message)
+                    continue
+                if step_index + 1 < len(BUCKET_STEPS):
+                    pending[pool.submit(create_bucket_step, s3_client, BUCKET_STEPS[step_index + 1], bucket)] = (bucket, step_index + 1)
+                else:
+                    if len(buckets) > 1:
+                        print(f"Created {bucket['access']} bucket: {bucket['name']}")
+                    created.append(bucket)
+
+    if created:
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        write_through(lambda: inventory_index.upsert([tagged_row(
+            's3', bucket['name'], bucket['name'], s3_client.meta.region_name, now, get_aws_tags(bucket['tags']))
+            for bucket in created]))
+        ownership_cache.put_many('s3', {bucket['name']: True for bucket in created})
+    return created, failed
+
+
 # מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת S3
 @s3.command()
 # מגדיר את הפרמטר access (סוג הגישה) שיועבר לפונקציה
@@ -224,47 +1324,420 @@ def s3():
     # מגביל את המשתמש לבחור אך ורק בין האופציות 'public' או 'private' (ולא רגיש לאותיות גדולות/קטנות)
     type=click.Choice(['public', 'private'], case_sensitive=False),
     # טקסט עזרה שיופיע אם המשתמש יקליד --help
-    help='Specify the access type (public, private).'
+    help='Specify the access type (public, private). With --file: the default for rows without one.'
 )
-# מגדיר את הפרמטר name (שם הדלי) שהוא חובה
-@click.option('--name', required=True, help='Name of the bucket')
+# מגדיר את הפרמטר name (שם הדלי). חובה אם לא נותנים קובץ
+@click.option('--name', help='Name of the bucket')
+# קובץ עם הרבה דליים. אפשר להעביר - כדי לקרוא מה-stdin
+@click.option('--file', 'stream', type=click.File('r'), help='CSV/JSON/NDJSON manifest of buckets (- for stdin)')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'json', 'ndjson']), help='Manifest format (default: by file extension)')
+@click.option('--tag', 'tag_values', multiple=True, help='Extra tag for every bucket, Key=Value (repeatable)')
+@click.option('--workers', default=S3_CONFIG['MAX_CONCURRENCY'], show_default=True,
+              type=click.IntRange(1, API_CONFIG['MAX_POOL_CONNECTIONS']),
+              help='How many bucket steps run at the same time')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation of public buckets')
 # הפונקציה שמבצעת את יצירת הדלי בפועל, מקבלת את השם והגישה שהמשתמש בחר
-def create(name, access):
-    """Creates a bucket"""
+def create(access, name, stream, file_format, tag_values, workers, yes):
+    """Creates a bucket, or every bucket of a manifest"""
+    if bool(name) == bool(stream):
+        raise click.UsageError('Give either --name or --file')
+    extra_tags = parse_tag_selector(tag_values)
+
+    if stream:
+        # אם לא צוין פורמט, מנחשים לפי הסיומת של הקובץ
+        if file_format is None:
+            extension = os.path.splitext(str(stream.name))[1].lower().lstrip('.')
+            file_format = extension if extension in ('csv', 'json') else 'ndjson'
+        buckets = read_bucket_manifest(stream, file_format, access or 'private', extra_tags)
+    else:
+        buckets = [{'name': name, 'access': (access or 'private').lower(), 'tags': extra_tags}]
+    # התגית CreatedBy היא הדרך היחידה לזהות משאבים שלנו, אז אסור לדרוס אותה
+    if any('CreatedBy' in bucket['tags'] for bucket in buckets):
+        raise click.ClickException('The CreatedBy tag is set by the CLI and cannot be changed')
+    if not buckets:
+        print("No buckets to create.")
+        return
 
-    # בדיקה: אם המשתמש בחר 'public', רק אז נפעיל את מנגנון האישור (הוספתי את השורה הזו לתיקון הלוגיקה)
-    if access == 'public':
+    # אם יש דליים ציבוריים, מפעילים את מנגנון האישור (פעם אחת לכולם, ואפשר לדלג עם --yes)
+    public = [bucket['name'] for bucket in buckets if bucket['access'] == 'public']
+    if public and not yes:
         # שואל את המשתמש "האם אתה בטוח?" ועוצר את התוכנית (return) אם התשובה היא "לא"
-        if not click.confirm(f'WARNING: Bucket {name} will be PUBLIC. Are you sure?', default=False):
+        names = public[0] if len(public) == 1 else f"{len(public)} buckets ({', '.join(public[:5])}{', ...' if len(public) > 5 else ''})"
+        if not click.confirm(f'WARNING: Bucket {names} will be PUBLIC. Are you sure?', default=False):
             print('Aborted!')
             return
 
-    print(f'Creating {access} bucket: {name}...')
-
-    # יצירת חיבור (Client) שמאפשר לנו לדבר עם שירות ה-S3 של אמזון
-    s3_client = boto3.client('s3')
+    if len(buckets) == 1:
+        print(f"Creating {buckets[0]['access']} bucket: {buckets[0]['name']}...")
+    else:
+        print(f"Creating {len(buckets)} buckets with {workers} workers...")
 
     # בלוק המנסה להריץ את הקוד, ותופס שגיאות אם משהו נכשל (למשל אם השם כבר תפוס ע"י מישהו אחר בעולם)
     try:
-        # שולח את הפקודה לאמזון ליצירת הדלי עם השם שהתקבל
-        s3_client.create_bucket(Bucket=name)
-        # מוסיף את הגדרות ההצפנה (AES256) לדלי שיצרנו - חובה לפי הדרישות
-        s3_client.put_bucket_encryption(
-            Bucket=name,
-            # משתמש בקונפיגורציה המוכנה מראש להצפנה
-            ServerSideEncryptionConfiguration = S3_CONFIG['Encryption']
-        )
-        # מוסיף את התגיות לדלי (כי הפקודה create_bucket לא תומכת בזה)
-        s3_client.put_bucket_tagging(
-            Bucket=name,
-            # משתמש בפונקציית העזר כדי לקבל את מבנה התגיות הנכון
-            Tagging={'TagSet': get_aws_tags()}
-        )
+        created, failed = create_buckets(buckets, workers)
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        sys.exit(1)
+    if len(buckets) == 1 and created:
         print("Bucket created successfully!")
+    elif len(buckets) > 1:
+        print(f"Created {len(created)} of {len(buckets)} buckets")
+    if failed:
+        sys.exit(1)
+
+
+class TransferProgress:
+    """Thread-safe progress and throughput readout for S3 transfers"""
+
+    def __init__(self, total, label):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.started = time.monotonic()
+        self.last_print = 0
+        self.lock = threading.Lock()
+        # boto3 מדווח התקדמות מ-Threads משלו, אז שומרים את ה-Context (ב-serve: לאיזה לקוח להדפיס)
+        self.context = contextvars.copy_context()
+
+    def __call__(self, bytes_amount):
+        # boto3 קורא לפונקציה הזו מכמה Threads, כל פעם עם כמות הבתים שעברה
+        with self.lock:
+            self.done += bytes_amount
+            now = time.monotonic()
+            # לא מדפיסים יותר מפעמיים בשנייה כדי לא להאט את ההעברה
+            if now - self.last_print < 0.5:
+                return
+            self.last_print = now
+            self._print(end='\r')
+
+    def _print(self, end):
+        elapsed = max(time.monotonic() - self.started, 0.001)
+        speed = self.done / elapsed / MB
+        # ב-stdin אין גודל ידוע מראש (total=None), אז מציגים רק כמה עבר
+        if self.total is None:
+            line = f"{self.label}: {self.done / MB:.1f} MB {speed:.1f} MB/s"
+        else:
+            percent = self.done * 100 / self.total if self.total else 100
+            line = f"{self.label}: {percent:5.1f}% {self.done / MB:.1f}/{self.total / MB:.1f} MB {speed:.1f} MB/s"
+        self.context.run(print, line, end=end, file=sys.stderr, flush=True)
+
+    def finish(self):
+        with self.lock:
+            self._print(end='\n')
+
+
+def make_transfer_config(part_size, concurrency, max_bandwidth):
+    """Builds a boto3 TransferConfig from the CLI options (sizes in MB)"""
+    from boto3.s3.transfer import TransferConfig
+    return TransferConfig(
+        multipart_threshold=part_size * MB,
+        multipart_chunksize=part_size * MB,
+        max_concurrency=concurrency,
+        max_bandwidth=int(max_bandwidth * MB) if max_bandwidth else None
+    )
 
-    # אם קרתה תקלה (כמו שם תפוס), הקוד יגיע לכאן וידפיס את השגיאה במקום לקרוס
-    except Exception as e:
-        print(f"Error: {e}")
+
+def transfer_state_path(*parts):
+    """Returns the local state file that tracks a resumable transfer"""
+    # שם הקובץ נגזר מהדלי, המפתח והנתיב המקומי - כך שכל העברה מקבלת קובץ משלה
+    digest = hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+    return os.path.join(CACHE_CONFIG['DIR'], 'transfers', digest + '.json')
+
+
+def load_state(path):
+    """Reads a JSON state file, returns None if it is missing or broken"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(path, state):
+    """Writes a JSON state file atomically"""
+    # כותבים קודם לקובץ זמני ורק אז מחליפים, כדי שקריסה באמצע לא תשאיר קובץ שבור
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def resumable_upload(s3_client, file, bucket, key, part_size, concurrency, limiter, progress):
+    """Multipart upload that records finished parts so it can continue after a failure"""
+    size = os.path.getsize(file)
+    mtime = os.path.getmtime(file)
+    state_path = transfer_state_path('upload', bucket, key, os.path.abspath(file))
+    state = load_state(state_path)
+
+    # אפשר להמשיך רק אם הקובץ לא השתנה מאז הניסיון הקודם
+    if state and (state['size'], state['mtime'], state['part_size']) == (size, mtime, part_size):
+        # הרשימה של אמזון היא המקור האמין - לוקחים ממנה את החלקים שבאמת הגיעו
+        try:
+            parts = {}
+            for page in paginate(s3_client, 'list_parts', Bucket=bucket, Key=key, UploadId=state['upload_id']):
+                for part in page.get('Parts', []):
+                    parts[str(part['PartNumber'])] = part['ETag']
+            state['parts'] = parts
+            print(f"Resuming upload: {len(parts)} parts already uploaded", file=sys.stderr)
+            stale_upload_id = None
+        except Exception:
+            # ה-Upload הישן כבר לא קיים (למשל נמחק ע"י Lifecycle) - מתחילים מחדש
+            stale_upload_id = state['upload_id']
+            state = None
+    else:
+        stale_upload_id = state['upload_id'] if state else None
+        state = None
+
+    # ה-Upload הישן לא ימשיך יותר, אבל החלקים שלו נשמרים (ועולים כסף) עד שמבטלים אותו
+    if stale_upload_id:
+        try:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=stale_upload_id)
+        except Exception:
+            # כבר לא קיים (NoSuchUpload) - אין מה לבטל
+            pass
+
+    if state is None:
+        response = s3_client.create_multipart_upload(Bucket=bucket, Key=key)
+        state = {'upload_id': response['UploadId'], 'size': size, 'mtime': mtime,
+                 'part_size': part_size, 'parts': {}}
+        save_state(state_path, state)
+
+    lock = threading.Lock()
+    part_bytes = part_size * MB
+    part_count = max(1, -(-size // part_bytes))
+    progress(sum(min(part_bytes, size - (int(n) - 1) * part_bytes) for n in state['parts']))
+
+    # פונקציה שרצה ב-Thread: קוראת חלק אחד מהקובץ, מעלה אותו ושומרת שהוא הסתיים
+    def upload_part(part_number):
+        offset = (part_number - 1) * part_bytes
+        length = min(part_bytes, size - offset)
+        if limiter:
+            limiter.acquire(length)
+        with open(file, 'rb') as f:
+            f.seek(offset)
+            body = f.read(length)
+        response = s3_client.upload_part(Bucket=bucket, Key=key, UploadId=state['upload_id'],
+                                         PartNumber=part_number, Body=body)
+        with lock:
+            state['parts'][str(part_number)] = response['ETag']
+            save_state(state_path, state)
+        progress(length)
+
+    missing = [n for n in range(1, part_count + 1) if str(n) not in state['parts']]
+    with ThreadPool(max_workers=concurrency) as pool:
+        # list() כדי ששגיאה באחד החלקים תיזרק החוצה
+        list(pool.map(upload_part, missing))
+
+    s3_client.complete_multipart_upload(
+        Bucket=bucket, Key=key, UploadId=state['upload_id'],
+        MultipartUpload={'Parts': [{'PartNumber': int(n), 'ETag': etag}
+                                   for n, etag in sorted(state['parts'].items(), key=lambda p: int(p[0]))]}
+    )
+    # ההעלאה הסתיימה - אין יותר צורך בקובץ המצב
+    os.remove(state_path)
+
+
+def resumable_download(s3_client, bucket, key, local_filename, part_size, concurrency, limiter, progress):
+    """Ranged parallel download that records finished ranges so it can continue after a failure"""
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    size = head['ContentLength']
+    etag = head['ETag']
+    progress.total = size
+    part_bytes = part_size * MB
+    part_count = max(1, -(-size // part_bytes))
+    # מורידים לקובץ זמני, ומחליפים לשם הסופי רק כשהכל הגיע
+    tmp_path = local_filename + '.part'
+    state_path = transfer_state_path('download', bucket, key, os.path.abspath(local_filename))
+    state = load_state(state_path)
+
+    # ממשיכים רק אם הקובץ בענן לא השתנה וגם הקובץ הזמני עוד קיים
+    if not (state and state['etag'] == etag and state['part_size'] == part_size
+            and os.path.exists(tmp_path)):
+        state = {'etag': etag, 'size': size, 'part_size': part_size, 'done': []}
+        # מקצים מראש את כל הקובץ כדי שכל Thread יוכל לכתוב למקום שלו
+        with open(tmp_path, 'wb') as f:
+            f.truncate(size)
+        save_state(state_path, state)
+    elif state['done']:
+        print(f"Resuming download: {len(state['done'])} of {part_count} parts already downloaded", file=sys.stderr)
+
+    lock = threading.Lock()
+    progress(sum(min(part_bytes, size - n * part_bytes) for n in state['done']))
+
+    def download_part(index):
+        offset = index * part_bytes
+        length = min(part_bytes, size - offset)
+        if limiter:
+            limiter.acquire(length)
+        # IfMatch מבטיח שלא נערבב חלקים מגרסאות שונות של הקובץ
+        response = s3_client.get_object(Bucket=bucket, Key=key, IfMatch=etag,
+                                        Range=f'bytes={offset}-{offset + length - 1}')
+        with open(tmp_path, 'r+b') as f:
+            f.seek(offset)
+            for chunk in response['Body'].iter_chunks(MB):
+                f.write(chunk)
+                progress(len(chunk))
+        with lock:
+            state['done'].append(index)
+            save_state(state_path, state)
+
+    finished = set(state['done'])
+    missing = [n for n in range(part_count) if n not in finished]
+    with ThreadPool(max_workers=concurrency) as pool:
+        list(pool.map(download_part, missing))
+
+    os.replace(tmp_path, local_filename)
+    os.remove(state_path)
+
+
+class PartReader(io.RawIOBase):
+    """Read-only, seekable file object over a slice of a reusable buffer (no copy)"""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        count = max(0, min(len(target), len(self.view) - self.position))
+        target[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # botocore קורא את הגוף כדי לחשב Checksum ואז חוזר להתחלה (וגם ב-Retry)
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: len(self.view)}[whence]
+        self.position = base + offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+def read_into(stream, view):
+    """Fills a buffer from a stream; returns how many bytes were read (less only at the end)"""
+    filled = 0
+    while filled < len(view):
+        count = stream.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+def stream_upload(s3_client, stream, bucket, key, part_size, concurrency, limiter, progress):
+    """Uploads a stream of unknown size (e.g. stdin) as a multipart upload with constant memory"""
+    part_bytes = part_size * MB
+    # מאגר קבוע של Buffers: אחד נקרא מה-stream בזמן שהאחרים עולים במקביל.
+    # כשכולם תפוסים הקריאה מחכה - כך הזיכרון לא גדל גם אם הרשת איטית מה-stream
+    free_buffers = queue.Queue()
+    for _ in range(concurrency + 1):
+        free_buffers.put(bytearray(part_bytes))
+
+    buffer = free_buffers.get()
+    length = read_into(stream, memoryview(buffer))
+    # קלט קטן מחלק אחד - מספיק put_object רגיל
+    if length < part_bytes:
+        if limiter:
+            limiter.acquire(length)
+        s3_client.put_object(Bucket=bucket, Key=key, Body=PartReader(memoryview(buffer)[:length]))
+        progress(length)
+        return
+
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId']
+    etags = {}
+
+    # פונקציה שרצה ב-Thread: מעלה חלק אחד ומחזירה את ה-Buffer למאגר
+    def upload_part(part_number, buffer, length):
+        try:
+            if limiter:
+                limiter.acquire(length)
+            response = s3_client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number,
+                                             Body=PartReader(memoryview(buffer)[:length]))
+            etags[part_number] = response['ETag']
+            progress(length)
+        finally:
+            free_buffers.put(buffer)
+
+    try:
+        with ThreadPool(max_workers=concurrency) as pool:
+            pending = set()
+            part_number = 1
+            while length:
+                if part_number > 10000:
+                    raise click.ClickException(f"More than 10,000 parts - use a bigger --part-size (now {part_size} MB)")
+                pending.add(pool.submit(upload_part, part_number, buffer, length))
+                # חלק שנכשל עוצר את הקריאה מיד (ולא רק בסוף ה-stream)
+                done = {future for future in pending if future.done()}
+                for future in done:
+                    future.result()
+                pending -= done
+                part_number += 1
+                buffer = free_buffers.get()
+                length = read_into(stream, memoryview(buffer))
+            for future in pending:
+                future.result()
+        s3_client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': etags[number]} for number in sorted(etags)]}
+        )
+    except BaseException:
+        # בלי stream אין ממה להמשיך - מוחקים את החלקים שכבר עלו כדי שלא נשלם עליהם
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+
+def stream_download(s3_client, bucket, key, part_size, concurrency, limiter, progress, out):
+    """Downloads an object to a stream (e.g. stdout) with parallel ranged GETs, written in order"""
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    size = head['ContentLength']
+    progress.total = size
+    part_bytes = part_size * MB
+    part_count = -(-size // part_bytes)
+
+    def fetch(index):
+        offset = index * part_bytes
+        length = min(part_bytes, size - offset)
+        if limiter:
+            limiter.acquire(length)
+        # IfMatch מבטיח שכל החלקים מגיעים מאותה גרסה של האובייקט
+        response = s3_client.get_object(Bucket=bucket, Key=key, IfMatch=head['ETag'],
+                                        Range=f'bytes={offset}-{offset + length - 1}')
+        data = response['Body'].read()
+        progress(len(data))
+        return data
+
+    # חלון של חלקים שבדרך: הם יכולים להגיע בכל סדר, אבל נכתבים רק לפי הסדר.
+    # לכל היותר concurrency + 1 חלקים בזיכרון, גם כשמי שקורא את הפלט איטי
+    window = concurrency + 1
+    futures = {}
+    next_to_submit = 0
+    with ThreadPool(max_workers=concurrency) as pool:
+        for index in range(part_count):
+            while next_to_submit < part_count and next_to_submit < index + window:
+                futures[next_to_submit] = pool.submit(fetch, next_to_submit)
+                next_to_submit += 1
+            out.write(futures.pop(index).result())
+        out.flush()
+
+
+# אופציות משותפות להעלאה ולהורדה: גודל חלק, מקביליות, הגבלת רוחב פס והמשך העברה שנקטעה
+def transfer_options(command):
+    command = click.option('--part-size', default=S3_CONFIG['PART_SIZE_MB'], show_default=True,
+                           type=click.IntRange(min=5), help='Multipart part size in MB')(command)
+    command = click.option('--concurrency', default=S3_CONFIG['MAX_CONCURRENCY'], show_default=True,
+                           type=click.IntRange(1, API_CONFIG['MAX_POOL_CONNECTIONS']),
+                           help='Parts transferred in parallel')(command)
+    command = click.option('--max-bandwidth', type=float, help='Bandwidth limit in MB/s')(command)
+    command = click.option('--resume', is_flag=True,
+                           help='Record finished parts locally so an interrupted transfer can continue')(command)
+    return command
 
 
 # מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת S3
@@ -273,16 +1746,35 @@ def create(name, access):
 # (הוספתי את ה -- בהתחלה כי זה חובה ב-Click)
 @click.option('--bucket', required=True, help='Target bucket name')
 # מגדיר פרמטר לקובץ, ומשתמש ב-Click כדי לוודא אוטומטית שהקובץ באמת קיים במחשב
-# (בגלל exists=True, אם הקובץ לא קיים - התוכנית תעצור לבד ותזרוק שגיאה ברורה)
-@click.option('--file', required=True, type=click.Path(exists=True), help='Path to file')
+# (בגלל exists=True, אם הקובץ לא קיים - התוכנית תעצור לבד ותזרוק שגיאה ברורה). - קורא מה-stdin
+@click.option('--file', required=True, type=click.Path(exists=True, allow_dash=True), help='Path to file (- for stdin)')
 # פרמטר אופציונלי (בלי required=True)
 @click.option('--key', help='Rename the file in S3 (Optional)')
+@transfer_options
 # הפונקציה המבצעת את ההעלאה. מחקתי את ה-if הידני כי Click כבר עשה את הבדיקה למעלה
-def upload(bucket, file, key):
+def upload(bucket, file, key, part_size, concurrency, max_bandwidth, resume):
     """Upload a file to S3"""
 
     # יצירת החיבור לשירות S3
-    s3_client = boto3.client('s3')
+    s3_client = get_client('s3')
+
+    # העלאה מה-stdin (למשל pg_dump | gzip | ...) - ישר ל-S3 בלי קובץ זמני בדיסק
+    if file == '-':
+        if not key:
+            raise click.UsageError('--key is required when uploading from stdin.')
+        if resume:
+            raise click.UsageError("--resume cannot be used with stdin (the input can't be read again).")
+        progress = TransferProgress(None, "Uploading stdin")
+        try:
+            limiter = RateLimiter(max_bandwidth * MB) if max_bandwidth else None
+            stream_upload(s3_client, sys.stdin.buffer, bucket, key, part_size, concurrency, limiter, progress)
+            progress.finish()
+            print(f"Uploaded stdin ({progress.done / MB:.1f} MB) to '{bucket}' as '{key}'")
+        except Exception as e:
+            # בתוך pipeline חשוב שגם קוד היציאה יגיד שההעלאה נכשלה
+            print(f"Error: {describe_error(e)}")
+            sys.exit(1)
+        return
 
     # בודקים האם המשתמש הזין ערך בפרמטר האופציונלי key
     if key:
@@ -294,10 +1786,20 @@ def upload(bucket, file, key):
         # ברירת המחדל: השם בענן יהיה זהה בדיוק לשם (או הנתיב) של הקובץ במחשב
         target_name = file
 
+    size = os.path.getsize(file)
+    progress = TransferProgress(size, f"Uploading {file}")
+
     # מתחילים את תהליך ההעלאה בתוך בלוק הגנה (try) למקרה של תקלות
     try:
-        # הפקודה המרכזית: מעלים את הקובץ (file) לדלי (bucket) ושומרים אותו תחת השם שבחרנו (target_name)
-        s3_client.upload_file(file, bucket, target_name)
+        # קובץ שגדול מחלק אחד עם --resume עובר במנוע שלנו ששומר אילו חלקים כבר עלו
+        if resume and size > part_size * MB:
+            limiter = RateLimiter(max_bandwidth * MB) if max_bandwidth else None
+            resumable_upload(s3_client, file, bucket, target_name, part_size, concurrency, limiter, progress)
+        else:
+            # הפקודה המרכזית: מעלים את הקובץ (file) לדלי (bucket) ושומרים אותו תחת השם שבחרנו (target_name)
+            s3_client.upload_file(file, bucket, target_name, Callback=progress,
+                                  Config=make_transfer_config(part_size, concurrency, max_bandwidth))
+        progress.finish()
 
         # אם השורה למעלה הצליחה, מודיעים למשתמש שהכל עבר בשלום
         print(f"Uploaded '{file}' to '{bucket}' as '{target_name}'")
@@ -305,7 +1807,9 @@ def upload(bucket, file, key):
 
     # תופס שגיאות (כמו הרשאות חסרות או דלי שלא קיים) ומדפיס אותן
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"Error: {describe_error(e)}")
+        if resume:
+            print("Run the same command again with --resume to continue.")
 
 
 # מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת S3
@@ -314,14 +1818,32 @@ def upload(bucket, file, key):
 @click.option('--bucket', required=True, help='Source bucket name')
 # המפתח (שם הקובץ בענן) שאותו אנחנו רוצים להוריד (חובה - אחרת לא נדע מה להביא)
 @click.option('--key', required=True, help='The file name in S3 to download')
-# לאן לשמור במחשב? (אופציונלי)
-@click.option('--file', help='Local path to save the file (Optional)')
+# לאן לשמור במחשב? (אופציונלי). - כותב ל-stdout
+@click.option('--file', help='Local path to save the file, - for stdout (Optional)')
+@transfer_options
 # הפונקציה המבצעת את ההורדה
-def download(bucket, key, file):
+def download(bucket, key, file, part_size, concurrency, max_bandwidth, resume):
     """Download a file from S3"""
 
     # יצירת החיבור לשירות S3
-    s3_client = boto3.client('s3')
+    s3_client = get_client('s3')
+
+    # הורדה ל-stdout (למשל ... | gunzip | psql) - ה-stdout שייך רק לתוכן, אז כל ההודעות הולכות ל-stderr
+    if file == '-':
+        if resume:
+            raise click.UsageError('--resume cannot be used with stdout.')
+        progress = TransferProgress(0, f"Downloading {key}")
+        try:
+            limiter = RateLimiter(max_bandwidth * MB) if max_bandwidth else None
+            stream_download(s3_client, bucket, key, part_size, concurrency, limiter, progress, sys.stdout.buffer)
+        except BrokenPipeError:
+            # מי שקרא את הפלט הפסיק לקרוא (למשל head) - זו לא שגיאה
+            return
+        except Exception as e:
+            print(f"Error: {describe_error(e)}", file=sys.stderr)
+            sys.exit(1)
+        progress.finish()
+        return
 
     # בדיקה: האם המשתמש ביקש לשמור בשם ספציפי במחשב?
     if file:
@@ -334,16 +1856,418 @@ def download(bucket, key, file):
         local_filename = key
 
     try:
-        # מורידים מהדלי (bucket), את הקובץ (key), ושומרים למחשב (local_filename)
-        # שים לב שהסדר בתוך הסוגריים השתנה לעומת ה-upload!
-        s3_client.download_file(bucket, key, local_filename)
+        progress = TransferProgress(0, f"Downloading {key}")
+        if resume:
+            # המנוע שלנו מוריד טווחים במקביל לקובץ זמני ושומר אילו טווחים כבר הגיעו
+            limiter = RateLimiter(max_bandwidth * MB) if max_bandwidth else None
+            resumable_download(s3_client, bucket, key, local_filename, part_size, concurrency, limiter, progress)
+        else:
+            # צריך את הגודל של הקובץ כדי להציג אחוזים
+            progress.total = s3_client.head_object(Bucket=bucket, Key=key)['ContentLength']
+            # מורידים מהדלי (bucket), את הקובץ (key), ושומרים למחשב (local_filename)
+            # שים לב שהסדר בתוך הסוגריים השתנה לעומת ה-upload!
+            s3_client.download_file(bucket, key, local_filename, Callback=progress,
+                                    Config=make_transfer_config(part_size, concurrency, max_bandwidth))
+        progress.finish()
 
         # הודעת הצלח
         print(f"Downloaded '{key}' from '{bucket}' to '{local_filename}'")
 
     # תופס שגיאות (כמו קובץ שלא קיים בענן או בעיות רשת)
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"Error: {describe_error(e)}")
+        if resume:
+            print("Run the same command again with --resume to continue.")
+
+def file_md5(path):
+    """Returns the hex MD5 of a local file, read in 1 MB chunks"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(MB), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_multipart_etag(path, part_size, parts):
+    """Returns the ETag S3 gives a file uploaded in parts of part_size, or None if it would not have `parts` parts"""
+    size = os.path.getsize(path)
+    if max(1, -(-size // part_size)) != parts:
+        return None
+    # ETag של Multipart הוא MD5 של רשימת ה-MD5 של החלקים, ואחריו מספר החלקים
+    digests = hashlib.md5()
+    with open(path, 'rb') as f:
+        for part in iter(lambda: f.read(part_size), b''):
+            digests.update(hashlib.md5(part).digest())
+    return f'"{digests.hexdigest()}-{parts}"'
+
+
+def matches_filters(path, include, exclude):
+    """Checks a relative path against --include / --exclude glob patterns"""
+    # אם הוגדרו include - הקובץ חייב להתאים לפחות לאחד מהם
+    if include and not any(fnmatch.fnmatch(path, pattern) for pattern in include):
+        return False
+    return not any(fnmatch.fnmatch(path, pattern) for pattern in exclude)
+
+
+def walk_local(directory):
+    """Returns {relative path: (size, mtime)} for every file under a directory"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            # ב-S3 תמיד משתמשים ב-/ גם אם מריצים על Windows
+            relative = os.path.relpath(path, directory).replace(os.sep, '/')
+            stat = os.stat(path)
+            files[relative] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+def list_remote_objects(s3_client, bucket, prefix):
+    """Returns {relative key: object summary} for every object under a prefix"""
+    objects = {}
+    for page in paginate(s3_client, 'list_objects_v2', Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            relative = obj['Key'][len(prefix):].lstrip('/')
+            # מדלגים על "תיקיות" ריקות שנוצרו בקונסול
+            if relative and not obj['Key'].endswith('/'):
+                objects[relative] = obj
+    return objects
+
+
+def is_in_sync(local_path, local_info, remote, entry):
+    """Decides whether a local file and an S3 object hold the same content"""
+    size, mtime = local_info
+    if remote['Size'] != size:
+        return False, entry
+    # המניפסט זוכר את ה-ETag בענן ואת ה-MD5 המקומי מהפעם האחרונה ששני הצדדים היו זהים
+    unchanged = entry is not None and entry['size'] == size and entry['mtime'] == mtime
+    remote_unchanged = entry is not None and entry.get('etag') == remote['ETag']
+    # אם אף צד לא השתנה מאז - אין צורך לחשב כלום
+    if unchanged and remote_unchanged:
+        return True, entry
+
+    # ה-Hash מחושב מחדש רק אם הקובץ המקומי השתנה (גודל או זמן שינוי)
+    md5 = entry['md5'] if unchanged and entry.get('md5') else file_md5(local_path)
+    if remote_unchanged and entry.get('md5'):
+        # הענן לא השתנה - מספיק לבדוק שהתוכן המקומי זהה למה שהיה (למשל קובץ שרק עבר touch)
+        same = md5 == entry['md5']
+    else:
+        etag = remote['ETag'].strip('"')
+        if '-' not in etag:
+            # ETag רגיל הוא בדיוק ה-MD5 של התוכן
+            same = md5 == etag
+        else:
+            # ETag של Multipart: מחשבים אותו מקומית לפי גודל החלק שהכלי מעלה בו. אם האובייקט הועלה
+            # בחלקים בגודל אחר לא נדע להשוות, ואז עדיף להעביר שוב
+            parts = int(etag.rsplit('-', 1)[1])
+            same = file_multipart_etag(local_path, S3_CONFIG['PART_SIZE_MB'] * MB, parts) == remote['ETag']
+    entry = {'size': size, 'mtime': mtime, 'md5': md5, 'etag': remote['ETag'] if same else None}
+    return same, entry
+
+
+# מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת S3
+@s3.command()
+@click.option('--dir', 'directory', required=True, type=click.Path(file_okay=False), help='Local directory')
+@click.option('--bucket', required=True, help='Bucket name')
+@click.option('--prefix', default='', help='Key prefix inside the bucket')
+# כיוון הסנכרון: up = מהמחשב לדלי, down = מהדלי למחשב
+@click.option('--direction', type=click.Choice(['up', 'down']), default='up', show_default=True, help='up: dir -> bucket, down: bucket -> dir')
+@click.option('--include', multiple=True, help='Only sync paths matching this glob (repeatable)')
+@click.option('--exclude', multiple=True, help='Skip paths matching this glob (repeatable)')
+@click.option('--delete', is_flag=True, help='Delete files that no longer exist on the source side')
+@click.option('--dry-run', is_flag=True, help='Only print what would be done')
+@click.option('--concurrency', default=S3_CONFIG['MAX_CONCURRENCY'], show_default=True,
+              type=click.IntRange(1, API_CONFIG['MAX_POOL_CONNECTIONS'] // S3_CONFIG['SYNC_FILE_CONCURRENCY']),
+              help='Files transferred in parallel')
+# הפונקציה שמסנכרנת תיקייה שלמה מול דלי
+def sync(directory, bucket, prefix, direction, include, exclude, delete, dry_run, concurrency):
+    """Sync a local directory with a bucket prefix"""
+    started = time.monotonic()
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+    if direction == 'up' and not os.path.isdir(directory):
+        print(f"Error: Directory '{directory}' does not exist.")
+        sys.exit(1)
+
+    # Client אחד שמשותף לכל ה-Threads
+    s3_client = get_client('s3')
+    # הכלי נוגע רק בדליים שהוא יצר - גם בהעלאה וגם במחיקה (--delete)
+    try:
+        is_our_bucket = bucket_is_ours(s3_client, bucket)
+    except Exception as e:
+        print(f"Error: Could not check bucket {bucket}: {describe_error(e)}")
+        sys.exit(1)
+    if is_our_bucket is None:
+        print(f"Error: Bucket {bucket} not found.")
+        sys.exit(1)
+    if not is_our_bucket:
+        print(f"Error: You cannot touch bucket {bucket}! It belongs to someone else.")
+        sys.exit(1)
+    try:
+        remote = list_remote_objects(s3_client, bucket, prefix)
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        sys.exit(1)
+    local = walk_local(directory) if os.path.isdir(directory) else {}
+    remote = {path: obj for path, obj in remote.items() if matches_filters(path, include, exclude)}
+    local = {path: info for path, info in local.items() if matches_filters(path, include, exclude)}
+
+    # המניפסט זוכר לכל קובץ את הגודל, זמן השינוי וה-Hash מהסנכרון הקודם
+    manifest_path = transfer_state_path('sync', bucket, prefix, os.path.abspath(directory))
+    manifest = load_state(manifest_path) or {}
+
+    # בונים את רשימת הקבצים שצריך להעביר ואת אלו שצריך למחוק
+    source, target = (local, remote) if direction == 'up' else (remote, local)
+    to_transfer = []
+    for path in sorted(source):
+        if path in target:
+            local_info = local[path]
+            same, entry = is_in_sync(os.path.join(directory, path), local_info, remote[path], manifest.get(path))
+            manifest[path] = entry
+            if same:
+                continue
+        to_transfer.append(path)
+    to_delete = sorted(set(target) - set(source)) if delete else []
+
+    verb = 'upload' if direction == 'up' else 'download'
+    if dry_run:
+        for path in to_transfer:
+            print(f"(dry run) {verb}: {path}")
+        for path in to_delete:
+            print(f"(dry run) delete: {path}")
+        print(f"(dry run) {len(to_transfer)} to {verb}, {len(to_delete)} to delete, {len(source) - len(to_transfer)} unchanged")
+        return
+
+    config = make_transfer_config(S3_CONFIG['PART_SIZE_MB'], S3_CONFIG['SYNC_FILE_CONCURRENCY'], None)
+    lock = threading.Lock()
+
+    # פונקציה שרצה ב-Thread: מעבירה קובץ אחד ומעדכנת את המניפסט
+    def transfer(path):
+        local_path = os.path.join(directory, path)
+        key = prefix + path
+        if direction == 'up':
+            s3_client.upload_file(local_path, bucket, key, Config=config)
+            # upload_file לא מחזיר את ה-ETag, אז שואלים עליו - כך הריצה הבאה תזהה כל שינוי בענן
+            etag = s3_client.head_object(Bucket=bucket, Key=key)['ETag']
+            size, mtime = local[path]
+        else:
+            os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+            s3_client.download_file(bucket, key, local_path, Config=config)
+            # הזמן של הקובץ המקומי יהיה זמן השינוי בענן, כדי שההשוואה הבאה תהיה נכונה
+            mtime = remote[path]['LastModified'].timestamp()
+            os.utime(local_path, (mtime, mtime))
+            etag, size = remote[path]['ETag'], remote[path]['Size']
+        # ב-ETag רגיל ה-MD5 כבר ידוע; ב-Multipart מחשבים אותו פעם אחת עכשיו ולא בכל ריצה
+        md5 = etag.strip('"') if '-' not in etag else file_md5(local_path)
+        entry = {'size': size, 'mtime': mtime, 'md5': md5, 'etag': etag}
+        with lock:
+            manifest[path] = entry
+        print(f"{verb}: {path}")
+        return source[path][0] if direction == 'up' else remote[path]['Size']
+
+    transferred = 0
+    failed = 0
+    with ThreadPool(max_workers=concurrency) as pool:
+        futures = {pool.submit(transfer, path): path for path in to_transfer}
+        for future, path in futures.items():
+            try:
+                transferred += future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error: {verb} {path}: {describe_error(e)}")
+    transfer_failed = failed
+
+    # מחיקה של מה שכבר לא קיים במקור. בדלי מוחקים עד 1000 מפתחות בקריאה אחת
+    deleted = []
+    if direction == 'up':
+        for batch in chunks(to_delete, S3_CONFIG['DELETE_BATCH_SIZE']):
+            try:
+                response = s3_client.delete_objects(
+                    Bucket=bucket, Delete={'Objects': [{'Key': prefix + path} for path in batch], 'Quiet': True})
+            except Exception as e:
+                failed += len(batch)
+                print(f"Error: delete {len(batch)} files: {describe_error(e)}")
+                continue
+            # עם Quiet אמזון מחזירה רק את מה שנכשל - וגם זה יכול לקרות
+            errors = {error['Key']: error['Message'] for error in response.get('Errors', [])}
+            for path in batch:
+                if prefix + path in errors:
+                    failed += 1
+                    print(f"Error: delete {path}: {errors[prefix + path]}")
+                else:
+                    deleted.append(path)
+    else:
+        for path in to_delete:
+            try:
+                os.remove(os.path.join(directory, path))
+            except OSError as e:
+                failed += 1
+                print(f"Error: delete {path}: {e}")
+                continue
+            deleted.append(path)
+    for path in deleted:
+        manifest.pop(path, None)
+        print(f"delete: {path}")
+
+    save_state(manifest_path, manifest)
+    elapsed = time.monotonic() - started
+    print(f"Synced {len(to_transfer) - transfer_failed} files ({transferred / MB:.1f} MB) in {elapsed:.1f}s, "
+          f"{len(source) - len(to_transfer)} unchanged, {len(deleted)} deleted, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+def fetch_bucket_tags(s3_client, bucket):
+    """Returns a bucket's AWS tag list ([] if it has none), or None if the bucket was not found"""
+    try:
+        tags = s3_client.get_bucket_tagging(Bucket=bucket)['TagSet']
+    except Exception as e:
+        code = (getattr(e, 'response', None) or {}).get('Error', {}).get('Code')
+        if code == 'NoSuchBucket':
+            return None
+        # דלי בלי תגיות (NoSuchTagSet) או בלי הרשאה לקרוא אותן - בכל מקרה זה לא שלנו.
+        # שגיאות אחרות (כמו Throttling) עוברות למי שקרא לנו - הן לא אומרות כלום על הדלי
+        if code not in ('NoSuchTagSet', 'AccessDenied'):
+            raise
+        tags = []
+    # כל בדיקה מול אמזון מעדכנת גם את המטמון
+    ownership_cache.put('s3', bucket, is_cli_owned(tags))
+    return tags
+
+
+def bucket_is_ours(s3_client, bucket):
+    """Returns True/False for bucket ownership, or None if the bucket was not found"""
+    # קודם בודקים במטמון המקומי אם כבר יודעים למי שייך הדלי
+    is_our_bucket = ownership_cache.get('s3', bucket)
+    if is_our_bucket is not None:
+        return is_our_bucket
+    tags = fetch_bucket_tags(s3_client, bucket)
+    return None if tags is None else is_cli_owned(tags)
+
+
+def iter_my_buckets(s3_client):
+    """Yields the buckets created by this CLI, in name order, checking tags in parallel"""
+    max_workers = S3_CONFIG['MAX_CONCURRENCY']
+    with ThreadPool(max_workers=max_workers) as pool:
+        # חלון של בדיקות שרצות במקביל. מוציאים מהתחלת החלון, כך שהסדר נשמר והזיכרון לא גדל עם מספר הדליים
+        window = []
+        for page in paginate(s3_client, 'list_buckets'):
+            for bucket in page['Buckets']:
+                window.append((bucket, pool.submit(bucket_is_ours, s3_client, bucket['Name'])))
+                if len(window) >= max_workers * 2:
+                    bucket, future = window.pop(0)
+                    if future.result():
+                        yield bucket
+        for bucket, future in window:
+            if future.result():
+                yield bucket
+
+
+# העמודות של s3 list, וכיצד מחלצים כל אחת מתיאור הדלי שאמזון מחזירה
+S3_COLUMNS = {
+    'name': lambda bucket: bucket['Name'],
+    'region': lambda bucket: bucket.get('BucketRegion', ''),
+    'created': lambda bucket: bucket['CreationDate'].isoformat(),
+}
+
+
+@s3.command(name='list')
+@click.option('--output', type=click.Choice(['table', 'json', 'ndjson']), default='table', show_default=True)
+@click.option('--columns', default=','.join(S3_COLUMNS), show_default=True, help='Comma separated columns to show')
+def list_buckets(output, columns):
+    """List buckets created by this CLI"""
+    columns = parse_columns(columns, S3_COLUMNS)
+    s3_client = get_client('s3')
+    rows = ({column: S3_COLUMNS[column](bucket) for column in columns} for bucket in iter_my_buckets(s3_client))
+    try:
+        print_rows(rows, columns, output)
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+
+
+def print_listing_entry(entry, output):
+    """Prints one object, prefix or summary line of s3 ls"""
+    if output == 'ndjson':
+        print(json.dumps(entry, default=str))
+    elif 'key' in entry:
+        print(f"{entry['last_modified']:%Y-%m-%d %H:%M:%S} {entry['size']:>14} {entry['key']}")
+    elif 'objects' in entry:
+        print(f"{entry['objects']:>10} objects {entry['bytes']:>16} bytes  {entry['prefix'] or '(top level)'}")
+    else:
+        print(f"{'PRE':>34} {entry['prefix']}")
+
+
+@s3.command(name='ls')
+@click.option('--bucket', required=True, help='Bucket name')
+@click.option('--prefix', default='', help='Only keys that start with this')
+@click.option('--delimiter', help="Group keys by this character, e.g. '/' (default: list every key)")
+@click.option('--summarize', is_flag=True,
+              help='Count objects and bytes (per group when --delimiter is given) instead of listing the groups')
+@click.option('--output', type=click.Choice(['text', 'ndjson']), default='text', show_default=True)
+def list_objects(bucket, prefix, delimiter, summarize, output):
+    """List the objects of a bucket created by this CLI"""
+    s3_client = get_client('s3')
+    try:
+        is_our_bucket = bucket_is_ours(s3_client, bucket)
+    except Exception as e:
+        print(f"Error: Could not check bucket {bucket}: {describe_error(e)}")
+        return
+    if is_our_bucket is None:
+        print(f"Error: Bucket {bucket} not found.")
+        return
+    if not is_our_bucket:
+        print(f"Error: You cannot touch bucket {bucket}! It belongs to someone else.")
+        return
+
+    total_objects = total_bytes = 0
+    # סיכום של הקבוצה הנוכחית. אמזון מחזירה מפתחות לפי סדר אלפביתי, אז כל קבוצה מגיעה ברצף אחד:
+    # כשמתחילה קבוצה חדשה אפשר להדפיס את הקודמת ולשכוח אותה (הזיכרון לא גדל עם מספר המפתחות)
+    group = None
+    group_objects = group_bytes = 0
+    # מפתחות שאין בהם delimiter אחרי ה-prefix לא שייכים לאף קבוצה, ומסוכמים בנפרד
+    loose_objects = loose_bytes = 0
+
+    # עם --summarize וקבוצות עוברים על כל המפתחות (בלי Delimiter) ומסכמים לבד לכל קבוצה
+    kwargs = {'Bucket': bucket, 'Prefix': prefix}
+    if delimiter and not summarize:
+        kwargs['Delimiter'] = delimiter
+    try:
+        # כל דף (עד 1000 מפתחות) מודפס מיד, בלי לחכות לשאר הדלי
+        for page in paginate(s3_client, 'list_objects_v2', **kwargs):
+            for common_prefix in page.get('CommonPrefixes', []):
+                print_listing_entry({'prefix': common_prefix['Prefix']}, output)
+            for obj in page.get('Contents', []):
+                total_objects += 1
+                total_bytes += obj['Size']
+                if not (summarize and delimiter):
+                    print_listing_entry({'key': obj['Key'], 'size': obj['Size'], 'last_modified': obj['LastModified']}, output)
+                    continue
+                head, separator, _ = obj['Key'][len(prefix):].partition(delimiter)
+                if not separator:
+                    loose_objects += 1
+                    loose_bytes += obj['Size']
+                    continue
+                key_group = prefix + head + delimiter
+                if key_group != group:
+                    if group is not None:
+                        print_listing_entry({'prefix': group, 'objects': group_objects, 'bytes': group_bytes}, output)
+                    group, group_objects, group_bytes = key_group, 0, 0
+                group_objects += 1
+                group_bytes += obj['Size']
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        return
+
+    if group is not None:
+        print_listing_entry({'prefix': group, 'objects': group_objects, 'bytes': group_bytes}, output)
+    if summarize and delimiter and loose_objects:
+        print_listing_entry({'prefix': prefix, 'objects': loose_objects, 'bytes': loose_bytes}, output)
+    if summarize:
+        if output == 'ndjson':
+            print(json.dumps({'total_objects': total_objects, 'total_bytes': total_bytes}))
+        else:
+            print(f"\nTotal Objects: {total_objects}\n   Total Size: {total_bytes} bytes ({total_bytes / MB:.1f} MB)")
+
 
 #
 @cli.group()
@@ -374,7 +2298,7 @@ def create(domain):
     ref = str(datetime.datetime.now())
 
     # יוצר חיבור (Client) לשירות ה-DNS של אמזון (Route53)
-    client = boto3.client('route53')
+    client = get_client('route53')
     # מכין את רשימת התגיות מראש, כולל החותמת זמן הייחודית ל-Zone הזה
     zone_tags = get_aws_tags({'Timestamp': ref})
     # שולח בקשה ליצירת Zone חדש. שים לב שאי אפשר לשלוח פה תגיות!
@@ -391,14 +2315,23 @@ def create(domain):
     # הפקודה split('/')[-1] לוקחת רק את החלק שאחרי הלוכסן האחרון (ה-ID הנקי).
     zone_id = response['HostedZone']['Id'].split('/')[-1]
     # פעולה נפרדת להוספת תגיות (כי אי אפשר לעשות את זה ביצירה עצמה)
-    client.change_tags_for_resource(
-        # אומרים לאמזון שאנחנו רוצים לתייג Hosted Zone
-        ResourceType='hostedzone',
-        # אומרים לאמזון *איזה* Zone לתייג (לפי ה-ID שחילצנו)
-        ResourceId=zone_id,
-        # רשימת התגיות שאנחנו רוצים להדביק
-        AddTags=zone_tags
-    )
+    try:
+        client.change_tags_for_resource(
+            # אומרים לאמזון שאנחנו רוצים לתייג Hosted Zone
+            ResourceType='hostedzone',
+            # אומרים לאמזון *איזה* Zone לתייג (לפי ה-ID שחילצנו)
+            ResourceId=zone_id,
+            # רשימת התגיות שאנחנו רוצים להדביק
+            AddTags=zone_tags
+        )
+    except Exception as e:
+        # בלי התגיות ה-Zone לא נחשב שלנו, אז לא שומרים אותו במטמון ולא באינדקס
+        print(f"Error: Zone {zone_id} was created but could not be tagged: {describe_error(e)}")
+        sys.exit(1)
+    # רק עכשיו ה-Zone החדש בוודאות שלנו - שומרים את זה במטמון לטובת manage-records
+    ownership_cache.put('route53', zone_id, True)
+    write_through(lambda: inventory_index.upsert([tagged_row(
+        'route53', zone_id, response['HostedZone']['Name'], 'global', '', zone_tags)]))
 
     # הודעת הצלחה למשתמש
     print(f"Zone created! ID: {zone_id}")
@@ -408,36 +2341,86 @@ def create(domain):
 @route53.command(name='list')
 # הפונקציה שמדפיסה את רשימת הדומיינים שנוצרו על ידי הכלי
 def list_routes():
-    # יוצר חיבור ל-Route53
-    client = boto3.client('route53')
-
-    # 1. מביאים את *כל* האזורים (Zones) שיש בחשבון, ללא סינון מוקדם
-    all_zones = client.list_hosted_zones()
-
-    # 2. לולאה שעוברת על כל Zone ברשימה שחזרה מאמזון
-    for zone in all_zones['HostedZones']:
-        # שומר את ה-ID של ה-Zone הנוכחי במשתנה זמני
-        current_id = zone['Id'].split('/')[-1]
-        # שומר את השם של ה-Zone הנוכחי (כדי להדפיס אותו בסוף אם הוא מתאים)
-        current_name = zone['Name']
-
-        # 3. מבקשים את התגיות עבור ה-ID הספציפי הזה בלבד
-        # (מבצעים קריאה נוספת ל-AWS עבור כל דומיין ברשימה)
-        tags_data = client.list_tags_for_resource(
-            # סוג המשאב
-            ResourceType='hostedzone',
-            # ה-ID הספציפי שאנחנו בודקים כרגע
-            ResourceId=current_id
-        )
+    """List hosted zones created by this CLI"""
+    # יוצר חיבור ל-Route53. ה-Client של boto3 בטוח לשימוש מכמה Threads במקביל
+    client = get_client('route53')
+
+    # פונקציה פנימית שרצה בתוך ה-Thread: בודקת בעלות לעד 10 Zones (מהמטמון, או בקריאה אחת)
+    # (הקצב של כל הקריאות, גם דפי הרשימה וגם התגיות, נשמר ע"י ה-ServiceLimiter של route53)
+    def fetch_owned(batch):
+        # מחזיר רק את השמות של ה-Zones שיש להם את התגית שלנו
+        return [name for _, name in owned_zones(client, batch)]
+
+    # מדפיס את התוצאות של כל Batch שכבר חזר, ומשאיר ברשימה רק את אלו שעוד רצים
+    def flush(pending, return_when):
+        done, still_running = wait(pending, return_when=return_when)
+        for future in done:
+            for name in future.result():
+                print(name)
+        return still_running
+
+    max_workers = ROUTE53_CONFIG['MAX_WORKERS']
+    with ThreadPool(max_workers=max_workers) as pool:
+        pending = set()
+        try:
+            # 1. עוברים דף אחרי דף על כל ה-Zones בחשבון (ולא רק על הדף הראשון)
+            for page in paginate(client, 'list_hosted_zones'):
+                zones = [(zone['Id'].split('/')[-1], zone['Name']) for zone in page['HostedZones']]
+                # 2. שולחים את ה-Zones בקבוצות של 10 לבדיקת תגיות במקביל
+                for batch in chunks(zones, ROUTE53_CONFIG['TAGS_BATCH_SIZE']):
+                    pending.add(pool.submit(fetch_owned, batch))
+                    # 3. לא מחזיקים יותר מדי עבודה בתור - מחכים שמשהו יסתיים ומדפיסים אותו מיד
+                    if len(pending) >= max_workers * 2:
+                        pending = flush(pending, FIRST_COMPLETED)
+            # מחכים לכל מה שנשאר
+            if pending:
+                flush(pending, ALL_COMPLETED)
+        except Exception as e:
+            # Throttling שנמשך גם אחרי ה-Retries (בדפי הרשימה או בבדיקת התגיות) - הודעה ולא Traceback
+            for future in pending:
+                future.cancel()
+            raise click.ClickException(f"Could not list hosted zones: {describe_error(e)}")
+
+
+def fetch_zone_tags(client, zone_ids):
+    """Returns {zone id: AWS tag list} for up to 10 zones in one call, and caches who owns them"""
+    response = client.list_tags_for_resources(ResourceType='hostedzone', ResourceIds=list(zone_ids))
+    tags = {tag_set['ResourceId']: tag_set['Tags'] for tag_set in response['ResourceTagSets']}
+    # שומרים את התשובות (גם השליליות) לפעם הבאה
+    ownership_cache.put_many('route53', {zone_id: is_cli_owned(zone_tags) for zone_id, zone_tags in tags.items()})
+    return tags
+
+
+def owned_zones(client, zones):
+    """Returns the (zone id, name) pairs of a batch of up to 10 zones that were created by this CLI"""
+    # קודם המטמון, ורק ה-Zones שלא ידועים נבדקים מול אמזון (בקריאה אחת)
+    known = ownership_cache.get_many('route53', [zone_id for zone_id, _ in zones])
+    unknown = [zone_id for zone_id, _ in zones if zone_id not in known]
+    if unknown:
+        known.update((zone_id, is_cli_owned(tags)) for zone_id, tags in fetch_zone_tags(client, unknown).items())
+    return [(zone_id, name) for zone_id, name in zones if known.get(zone_id)]
+
+
+def zone_is_ours(client, zoneid):
+    """Returns True/False for zone ownership, or None if the zone was not found"""
+    # קודם בודקים במטמון המקומי אם כבר יודעים למי שייך ה-Zone
+    is_our_zone = ownership_cache.get('route53', zoneid)
+    if is_our_zone is not None:
+        return is_our_zone
 
-        # מחלץ את רשימת התגיות מתוך המבנה המורכב של התשובה
-        actual_tags_list = tags_data['ResourceTagSet']['Tags']
-
-        # לולאה פנימית שעוברת על כל תגית שיש ל-Zone הזה
-        for tag in actual_tags_list:
-            # בדיקה: האם התגית הנוכחית היא המפתח והערך שאנחנו מחפשים?
-            if tag['Value'] == GLOBAL_TAGS['CreatedBy'] and tag['Key'] == 'CreatedBy':                # אם כן - מצאנו Zone שלנו! מדפיסים את שמו.
-                print(current_name)
+    # מתחיל בלוק מוגן (try) למקרה שהמשתמש הזין ID שגוי או לא קיים
+    # (שגיאות אחרות, כמו Throttling, עוברות למי שקרא לנו - הן לא אומרות שה-Zone לא קיים)
+    try:
+        # בודקים תגיות *רק* עבור ה-ID הספציפי שהמשתמש ביקש
+        # (בלי להביא את כל ה-Zones בעולם - חוסך זמן ומשאבים)
+        tags = fetch_zone_tags(client, [zoneid])
+    # תופס רק את השגיאות שאומרות שה-ID לא קיים ב-AWS
+    except (client.exceptions.NoSuchHostedZone, client.exceptions.InvalidInput):
+        return None
+    if zoneid not in tags:
+        return None
+    # בדיקה: האם מצאנו את "החתימה" שלנו (CreatedBy = platform-cli)?
+    return is_cli_owned(tags[zoneid])
 
 
 # מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת Route53
@@ -458,32 +2441,16 @@ def list_routes():
 # הפונקציה המבצעת את ניהול הרשומות. מקבלת את כל הפרמטרים שהגדרנו למעלה
 def manage_records(zoneid, name, value, action):
     # יוצר חיבור (Client) לשירות ה-DNS של אמזון (Route53)
-    client = boto3.client('route53')
+    client = get_client('route53')
 
-    # מאתחל "דגל בטיחות". ברירת המחדל היא False (אנחנו מניחים שה-Zone לא שלנו עד שיוכח אחרת)
-    is_our_zone = False
-
-    # מתחיל בלוק מוגן (try) למקרה שהמשתמש הזין ID שגוי או לא קיים
+    # בודקים (קודם במטמון ורק אחר כך מול אמזון) אם ה-Zone שייך לנו
     try:
-        # שלב ב: בודקים תגיות *רק* עבור ה-ID הספציפי שהמשתמש ביקש
-        # (בלי להביא את כל ה-Zones בעולם - חוסך זמן ומשאבים)
-        tags_data = client.list_tags_for_resource(
-            # מגדיר את סוג המשאב (Hosted Zone)
-            ResourceType='hostedzone',
-            # מעביר את ה-ID הספציפי לבדיקה
-            ResourceId=zoneid
-        )
-        # לולאה שעוברת על כל התגיות שחזרו עבור ה-Zone הספציפי הזה
-        for tag in tags_data['ResourceTagSet']['Tags']:
-            # בדיקה: האם מצאנו את "החתימה" שלנו (CreatedBy = platform-cli)?
-            if tag['Value'] == GLOBAL_TAGS['CreatedBy'] and tag['Key'] == 'CreatedBy':                # אם כן - מרים את הדגל לאישור (True)
-                is_our_zone = True
-                # מצאנו מה שחיפשנו, אין טעם להמשיך לבדוק תגיות אחרות
-                break
-
-                # תופס שגיאות כלליות (למשל אם ה-ID לא קיים ב-AWS)
-    except Exception:
-        # אם ה-ID בכלל לא קיים באמזון, תהיה שגיאה ונגיד שזה לא שלנו
+        is_our_zone = zone_is_ours(client, zoneid)
+    except Exception as e:
+        print(f"Error: Could not check zone {zoneid}: {describe_error(e)}")
+        return
+    # אם ה-ID בכלל לא קיים באמזון, תהיה שגיאה ונגיד שזה לא שלנו
+    if is_our_zone is None:
         print("Error: Zone ID not found.")
         return
 
@@ -493,38 +2460,1429 @@ def manage_records(zoneid, name, value, action):
         return
 
     # אם הגענו לפה, הכל תקין. שולחים את בקשת השינוי לאמזון
-    client.change_resource_record_sets(
-        # מזהה ה-Zone שבו נבצע את השינוי
-        HostedZoneId=zoneid,
-        # אובייקט שמכיל את רשימת השינויים לביצוע
-        ChangeBatch={
-            # רשימת השינויים (אנחנו שולחים שינוי אחד, אבל המבנה מחייב רשימה)
-            'Changes': [
-                {
-                    # הפעולה לביצוע (מה שהמשתמש בחר: CREATE, DELETE, UPSERT)
-                    'Action': action,
-                    # הגדרת הרשומה עצמה
-                    'ResourceRecordSet': {
-                        # שם הדומיין (המפתח)
-                        'Name': name,
-                        # סוג הרשומה (A Record = כתובת IP)
-                        'Type': 'A',
-                        # זמן חיים (בשניות) - כמה זמן שרתי DNS אחרים יזכרו את הכתובת הזו
-                        'TTL': ROUTE53_CONFIG['DEFAULT_TTL'],
-                        # רשימת הערכים (לאן הדומיין יפנה)
-                        'ResourceRecords': [
-                            # הערך הספציפי (ה-IP שהמשתמש הזין)
-                            {'Value': value}
-                        ]
+    try:
+        client.change_resource_record_sets(
+            # מזהה ה-Zone שבו נבצע את השינוי
+            HostedZoneId=zoneid,
+            # אובייקט שמכיל את רשימת השינויים לביצוע
+            ChangeBatch={
+                # רשימת השינויים (אנחנו שולחים שינוי אחד, אבל המבנה מחייב רשימה)
+                'Changes': [
+                    {
+                        # הפעולה לביצוע (מה שהמשתמש בחר: CREATE, DELETE, UPSERT)
+                        'Action': action,
+                        # הגדרת הרשומה עצמה
+                        'ResourceRecordSet': {
+                            # שם הדומיין (המפתח)
+                            'Name': name,
+                            # סוג הרשומה (A Record = כתובת IP)
+                            'Type': 'A',
+                            # זמן חיים (בשניות) - כמה זמן שרתי DNS אחרים יזכרו את הכתובת הזו
+                            'TTL': ROUTE53_CONFIG['DEFAULT_TTL'],
+                            # רשימת הערכים (לאן הדומיין יפנה)
+                            'ResourceRecords': [
+                                # הערך הספציפי (ה-IP שהמשתמש הזין)
+                                {'Value': value}
+                            ]
+                        }
                     }
-                }
-            ]
-        }
-    )
+                ]
+            }
+        )
+    # שגיאה אמיתית (למשל רשומה שכבר קיימת ב-CREATE) מודפסת בנפרד מ-Throttling
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        return
 
     # (אופציונלי) כדאי להוסיף הודעת הצלחה בסוף
     print(f"Successfully applied {action} on {name}")
 
 
+def read_ndjson_rows(stream, label='Record'):
+    """Yields (line number, parsed JSON) for every non-empty line"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            raise click.ClickException(f"{label} {line_number}: {e}")
+
+
+def read_record_changes(stream, file_format, default_zone=None):
+    """Yields (zoneid, change) pairs from a CSV, JSON or NDJSON stream"""
+    # בוחרים איך לקרוא את הקובץ לפי הפורמט שהמשתמש ביקש. כל פורמט נותן זוגות של (מספר רשומה, רשומה)
+    if file_format == 'csv':
+        rows = enumerate(csv.DictReader(stream), start=1)
+    elif file_format == 'json':
+        try:
+            data = json.load(stream)
+        except ValueError as e:
+            raise click.ClickException(f"Invalid JSON: {e}")
+        # מקבלים גם רשימה פשוטה וגם אובייקט עם מפתח changes
+        if isinstance(data, dict):
+            data = data.get('changes')
+        if not isinstance(data, list):
+            raise click.ClickException("JSON must be a list of changes or an object with a 'changes' list")
+        rows = enumerate(data, start=1)
+    else:
+        # NDJSON - כל שורה היא אובייקט JSON נפרד, קוראים שורה אחרי שורה בלי לטעון הכל לזיכרון
+        rows = read_ndjson_rows(stream)
+
+    for line_number, row in rows:
+        if not isinstance(row, dict):
+            raise click.ClickException(f"Record {line_number}: expected an object, got {json.dumps(row)}")
+        zoneid = row.get('zoneid') or row.get('zone_id') or default_zone
+        if not zoneid:
+            raise click.ClickException(f"Record {line_number}: missing zoneid")
+        action = (row.get('action') or 'UPSERT').upper()
+        if action not in ('CREATE', 'DELETE', 'UPSERT'):
+            raise click.ClickException(f"Record {line_number}: unknown action '{action}'")
+        if not row.get('name'):
+            raise click.ClickException(f"Record {line_number}: missing name")
+
+        # אפשר לתת ערך אחד (value) או כמה ערכים (values). ב-CSV מפרידים ערכים עם |
+        values = row.get('values') or row.get('value') or []
+        if isinstance(values, str):
+            values = [value for value in values.split('|') if value]
+        if not values:
+            raise click.ClickException(f"Record {line_number}: missing value")
+
+        # TTL חייב להיות מספר שלם לא שלילי (ב-CSV הוא מגיע כטקסט)
+        ttl = row.get('ttl') or ROUTE53_CONFIG['DEFAULT_TTL']
+        try:
+            ttl = int(ttl)
+        except (TypeError, ValueError):
+            ttl = -1
+        if ttl < 0:
+            raise click.ClickException(f"Record {line_number}: invalid ttl '{row.get('ttl')}'")
+
+        change = {
+            'Action': action,
+            'ResourceRecordSet': {
+                'Name': row['name'],
+                # כל סוג רשומה ו-TTL, ואם לא צוין - ברירות המחדל מה-Config
+                'Type': (row.get('type') or ROUTE53_CONFIG['RecordType']).upper(),
+                'TTL': ttl,
+                'ResourceRecords': [{'Value': str(value)} for value in values]
+            }
+        }
+        yield zoneid, change
+
+
+def pack_changes(changes):
+    """Packs Route53 changes into as few ChangeBatches as the API limits allow"""
+    batches = []
+    current = []
+    records = 0
+    chars = 0
+    for change in changes:
+        record_set = change['ResourceRecordSet']
+        # AWS סופר UPSERT פעמיים (מחיקה + יצירה), גם במספר הרשומות וגם בכמות התווים
+        weight = 2 if change['Action'] == 'UPSERT' else 1
+        change_records = len(record_set.get('ResourceRecords', [])) * weight
+        change_chars = sum(len(r['Value']) for r in record_set.get('ResourceRecords', [])) * weight
+
+        # אם השינוי לא נכנס ל-Batch הנוכחי, סוגרים אותו ופותחים חדש
+        if current and (len(current) >= ROUTE53_CONFIG['MAX_BATCH_CHANGES']
+                        or records + change_records > ROUTE53_CONFIG['MAX_BATCH_RECORDS']
+                        or chars + change_chars > ROUTE53_CONFIG['MAX_BATCH_CHARS']):
+            batches.append(current)
+            current = []
+            records = 0
+            chars = 0
+        current.append(change)
+        records += change_records
+        chars += change_chars
+    if current:
+        batches.append(current)
+    return batches
+
+
+def wait_for_changes(client, change_ids, timeout=600):
+    """Polls every pending Route53 change in one loop until all are INSYNC"""
+    pending = set(change_ids)
+    deadline = time.monotonic() + timeout
+    delay = 2
+    while pending:
+        # בודקים את כל השינויים שעוד לא הסתיימו, ומוציאים את אלו שכבר INSYNC
+        for change_id in list(pending):
+            try:
+                status = client.get_change(Id=change_id)['ChangeInfo']['Status']
+            except Exception as e:
+                raise click.ClickException(f"Could not check change {change_id.split('/')[-1]}: {describe_error(e)}")
+            if status == 'INSYNC':
+                pending.discard(change_id)
+                print(f"{change_id.split('/')[-1]}: INSYNC")
+        if not pending:
+            return True
+        now = time.monotonic()
+        if now >= deadline:
+            return False
+        # ישנים רק עד ה-deadline, ואז בודקים פעם אחרונה
+        time.sleep(min(delay, deadline - now))
+        # כל סבב מחכים קצת יותר, עד מקסימום 15 שניות
+        delay = min(delay * 2, 15)
+    return True
+
+
+# מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת Route53
+@route53.command()
+# קובץ השינויים. אפשר להעביר - כדי לקרוא מה-stdin
+@click.option('--file', 'stream', required=True, type=click.File('r'), help='CSV/JSON/NDJSON file with record changes (- for stdin)')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'json', 'ndjson']), help='File format (default: by file extension)')
+@click.option('--zoneid', help='Default zone id for records that do not specify one')
+@click.option('--wait', 'wait_insync', is_flag=True, help='Wait until all changes are INSYNC')
+@click.option('--timeout', default=600, show_default=True, help='Seconds to wait for INSYNC')
+# הפונקציה שמבצעת הרבה שינויי רשומות בבת אחת
+def apply(stream, file_format, zoneid, wait_insync, timeout):
+    """Apply many record changes from a file"""
+    # אם לא צוין פורמט, מנחשים לפי הסיומת של הקובץ
+    if file_format is None:
+        extension = os.path.splitext(str(stream.name))[1].lower().lstrip('.')
+        file_format = extension if extension in ('csv', 'json') else 'ndjson'
+
+    # מקבצים את השינויים לפי Zone, ושומרים על הסדר המקורי בתוך כל Zone
+    changes_by_zone = {}
+    for change_zone, change in read_record_changes(stream, file_format, zoneid):
+        changes_by_zone.setdefault(change_zone, []).append(change)
+
+    client = get_client('route53')
+
+    # בודקים בעלות פעם אחת לכל Zone (ולא פעם לכל רשומה)
+    for change_zone in changes_by_zone:
+        try:
+            is_our_zone = zone_is_ours(client, change_zone)
+        except Exception as e:
+            print(f"Error: Could not check zone {change_zone}: {describe_error(e)}")
+            return
+        if is_our_zone is None:
+            print(f"Error: Zone ID {change_zone} not found.")
+            return
+        if not is_our_zone:
+            print(f"Error: You cannot touch zone {change_zone}! It belongs to someone else.")
+            return
+
+    # פונקציה שרצה ב-Thread נפרד לכל Zone: שולחת את ה-Batches של ה-Zone לפי הסדר
+    def send_zone(change_zone, batches):
+        change_ids = []
+        for number, batch in enumerate(batches, start=1):
+            try:
+                response = client.change_resource_record_sets(
+                    HostedZoneId=change_zone,
+                    ChangeBatch={'Changes': batch}
+                )
+            except Exception as e:
+                # אם Batch נכשל לא ממשיכים לבאים אחריו באותו Zone, כי הסדר חשוב
+                print(f"Error: {change_zone} batch {number}/{len(batches)}: {describe_error(e)}")
+                return change_ids, False
+            change_ids.append(response['ChangeInfo']['Id'])
+            print(f"{change_zone}: batch {number}/{len(batches)} sent ({len(batch)} changes)")
+        return change_ids, True
+
+    all_change_ids = []
+    all_ok = True
+    with ThreadPool(max_workers=ROUTE53_CONFIG['MAX_WORKERS']) as pool:
+        futures = [pool.submit(send_zone, change_zone, pack_changes(changes))
+                   for change_zone, changes in changes_by_zone.items()]
+        for future in futures:
+            change_ids, ok = future.result()
+            all_change_ids.extend(change_ids)
+            all_ok = all_ok and ok
+
+    total = sum(len(changes) for changes in changes_by_zone.values())
+    print(f"Sent {total} changes to {len(changes_by_zone)} zones in {len(all_change_ids)} change batches")
+
+    # אם ביקשו - מחכים שכל השינויים יתפשטו (לולאה אחת שבודקת את כולם)
+    if wait_insync and all_change_ids:
+        if wait_for_changes(client, all_change_ids, timeout):
+            print("All changes are INSYNC")
+        else:
+            print("Error: Timed out waiting for changes to be INSYNC")
+
+    if not all_ok:
+        print("Error: Some changes were not applied.")
+
+
+
+def normalize_record_name(name):
+    """Route53 record name in one comparable form (lower case, trailing dot, no \\ooo escapes)"""
+    # Route53 מחזירה תווים מיוחדים בקידוד אוקטלי, למשל *.example.com חוזר כ-\052.example.com
+    name = re.sub(r'\\(\d{3})', lambda match: chr(int(match.group(1), 8)), name).lower()
+    return name if name.endswith('.') else name + '.'
+
+
+def record_key(record):
+    """The identity of a record set: (name, type, set identifier)"""
+    return normalize_record_name(record['Name']), record['Type'], record.get('SetIdentifier', '')
+
+
+def canonical_record(record):
+    """A record set as a string that is equal for equal records (order of values doesn't matter)"""
+    data = dict(record, Name=normalize_record_name(record['Name']))
+    if 'ResourceRecords' in data:
+        data['ResourceRecords'] = sorted(data['ResourceRecords'], key=lambda value: value['Value'])
+    if 'AliasTarget' in data:
+        data['AliasTarget'] = dict(data['AliasTarget'], DNSName=normalize_record_name(data['AliasTarget']['DNSName']))
+    return json.dumps(data, sort_keys=True)
+
+
+def is_zone_apex_record(record, zone_name):
+    """True for the zone's own NS and SOA records, which are managed by Route53"""
+    return record['Type'] in ('NS', 'SOA') and normalize_record_name(record['Name']) == normalize_record_name(zone_name)
+
+
+def bind_lines(record):
+    """Yields the BIND zone file lines of one record set"""
+    name = normalize_record_name(record['Name'])
+    # Alias ומדיניות ניתוב (Weighted, Latency...) לא קיימים ב-BIND, אז כותבים אותם רק כהערה
+    if 'AliasTarget' in record:
+        yield f"; ALIAS {name} {record['Type']} -> {record['AliasTarget']['DNSName']}"
+        return
+    if 'SetIdentifier' in record:
+        yield f"; {name} {record['Type']} with routing policy (set {record['SetIdentifier']}) - see the NDJSON export"
+        return
+    for value in record.get('ResourceRecords', []):
+        yield f"{name}\t{record['TTL']}\tIN\t{record['Type']}\t{value['Value']}"
+
+
+# מילה בגרשיים (כולל רווחים בפנים), הערה, סוגריים, או כל רצף בלי רווחים
+BIND_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|;.*|[()]|[^\s;()"]+')
+
+
+# TTL בקובץ BIND: מספר שניות, או עם יחידות כמו 1h30m
+BIND_TTL_PART = re.compile(r'(\d+)([smhdw]?)')
+BIND_TTL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# אילו שדות בערך של כל סוג רשומה הם שמות דומיין, שיחסיים ל-$ORIGIN אם אין להם נקודה בסוף
+BIND_NAME_FIELDS = {'CNAME': [0], 'NS': [0], 'PTR': [0], 'MX': [1], 'SRV': [3]}
+
+
+def qualify_bind_name(name, origin):
+    """Turns a zone file name (@, relative or absolute) into a fully qualified name"""
+    if name == '@':
+        return origin
+    return name if name.endswith('.') else f"{name}.{origin}"
+
+
+def parse_bind_ttl(value):
+    """Turns a BIND TTL (3600, 1h, 1h30m) into seconds, or None if the value is not a TTL"""
+    value = value.lower()
+    parts = BIND_TTL_PART.findall(value)
+    if not parts or ''.join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(int(number) * BIND_TTL_UNITS[unit] for number, unit in parts)
+
+
+def read_bind_records(stream, origin):
+    """Reads a BIND zone file into {record key: record set}, joining lines of the same name and type"""
+    origin = normalize_record_name(origin)
+    default_ttl = ROUTE53_CONFIG['DEFAULT_TTL']
+    records = {}
+    owner = origin
+    tokens = []
+    depth = 0
+    for line_number, line in enumerate(stream, start=1):
+        # נקבע רק בשורה הראשונה של רשומה (רשומה בסוגריים נמשכת על כמה שורות):
+        # שורה שמתחילה ברווח שייכת לאותו שם כמו השורה הקודמת, ומספר השורה משמש להודעות שגיאה
+        if not tokens:
+            starts_with_owner = line[:1] not in (' ', '\t')
+            start_line = line_number
+        for token in BIND_TOKEN.findall(line):
+            if token.startswith(';'):
+                break
+            if token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+            else:
+                tokens.append(token)
+        # רשומה בסוגריים (כמו SOA) יכולה להימשך על כמה שורות
+        if depth > 0 or not tokens:
+            continue
+        fields, tokens = tokens, []
+
+        if fields[0] == '$ORIGIN':
+            origin = normalize_record_name(fields[1])
+            continue
+        if fields[0] == '$TTL':
+            default_ttl = parse_bind_ttl(fields[1]) if len(fields) > 1 else None
+            if default_ttl is None:
+                raise click.ClickException(f"Line {start_line}: invalid $TTL: {line.strip()}")
+            continue
+        if starts_with_owner:
+            name = fields.pop(0)
+            owner = qualify_bind_name(name, origin)
+        ttl = default_ttl
+        # אחרי השם יכולים להופיע TTL ו-Class (IN) בכל סדר, ואז הסוג והערך
+        while fields and (fields[0][:1].isdigit() or fields[0].upper() == 'IN'):
+            field = fields.pop(0)
+            if field.upper() != 'IN':
+                ttl = parse_bind_ttl(field)
+                if ttl is None:
+                    raise click.ClickException(f"Line {start_line}: invalid TTL '{field}'")
+        if len(fields) < 2:
+            raise click.ClickException(f"Line {start_line}: invalid zone file line: {line.strip()}")
+        record_type, rdata = fields[0].upper(), fields[1:]
+        # www CNAME web הוא web.<origin>, ו-Route53 מצפה לשם המלא
+        for index in BIND_NAME_FIELDS.get(record_type, []):
+            if index < len(rdata):
+                rdata[index] = qualify_bind_name(rdata[index], origin)
+        value = ' '.join(rdata)
+
+        record = {'Name': owner, 'Type': record_type, 'TTL': ttl, 'ResourceRecords': []}
+        record = records.setdefault(record_key(record), record)
+        record['ResourceRecords'].append({'Value': value})
+    return records
+
+
+def read_ndjson_records(stream):
+    """Reads record sets (one Route53 ResourceRecordSet JSON per line) into {record key: record set}"""
+    records = {}
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            records[record_key(record)] = record
+        except (ValueError, KeyError) as e:
+            raise click.ClickException(f"Record {line_number}: {e}")
+    return records
+
+
+def check_zone_access(client, zoneid):
+    """Prints an error and returns False unless the zone exists and belongs to this CLI"""
+    try:
+        is_our_zone = zone_is_ours(client, zoneid)
+    except Exception as e:
+        print(f"Error: Could not check zone {zoneid}: {describe_error(e)}")
+        return False
+    if is_our_zone is None:
+        print(f"Error: Zone ID {zoneid} not found.")
+        return False
+    if not is_our_zone:
+        print(f"Error: You cannot touch zone {zoneid}! It belongs to someone else.")
+        return False
+    return True
+
+
+# מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת Route53
+@route53.command()
+@click.option('--zoneid', required=True, help='The zone id')
+@click.option('--format', 'file_format', type=click.Choice(['bind', 'ndjson']), default='bind', show_default=True,
+              help='BIND zone file, or one Route53 record set (JSON) per line')
+@click.option('--file', 'stream', type=click.File('w'), default='-', show_default=True, help='Output file (- for stdout)')
+# הפונקציה שכותבת את כל הרשומות של Zone לקובץ, דף אחרי דף
+def export(zoneid, file_format, stream):
+    """Export all records of a zone to a BIND zone file or NDJSON"""
+    client = get_client('route53')
+    if not check_zone_access(client, zoneid):
+        return
+    try:
+        zone_name = client.get_hosted_zone(Id=zoneid)['HostedZone']['Name']
+        if file_format == 'bind':
+            stream.write(f"$ORIGIN {zone_name}\n")
+        count = 0
+        # כל דף נכתב ברגע שהוא מגיע, כך שגם Zone עם עשרות אלפי רשומות לא נשמר בזיכרון
+        for page in paginate(client, 'list_resource_record_sets', HostedZoneId=zoneid):
+            for record in page['ResourceRecordSets']:
+                if file_format == 'bind':
+                    stream.writelines(line + '\n' for line in bind_lines(record))
+                else:
+                    stream.write(json.dumps(record) + '\n')
+                count += 1
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        return
+    print(f"Exported {count} record sets from {zone_name}", file=sys.stderr)
+
+
+# מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) תחת קבוצת Route53
+@route53.command(name='import')
+@click.option('--zoneid', required=True, help='The zone id')
+@click.option('--file', 'stream', required=True, type=click.File('r'), help='BIND zone file or NDJSON export (- for stdin)')
+@click.option('--format', 'file_format', type=click.Choice(['bind', 'ndjson']),
+              help='File format (default: ndjson for .ndjson/.jsonl/.json files, otherwise bind)')
+@click.option('--diff', 'diff_only', is_flag=True,
+              help='Treat the file as the desired state: send only the changes, and delete records that are not in it')
+@click.option('--dry-run', is_flag=True, help='Only print the changes')
+@click.option('--wait', 'wait_insync', is_flag=True, help='Wait until all changes are INSYNC')
+@click.option('--timeout', default=600, show_default=True, help='Seconds to wait for INSYNC')
+# הפונקציה שמביאה Zone למצב שבקובץ
+def import_records(zoneid, stream, file_format, diff_only, dry_run, wait_insync, timeout):
+    """Import records from a BIND zone file or NDJSON (with --diff: only what changed)"""
+    if file_format is None:
+        extension = os.path.splitext(str(stream.name))[1].lower().lstrip('.')
+        file_format = 'ndjson' if extension in ('ndjson', 'jsonl', 'json') else 'bind'
+
+    client = get_client('route53')
+    if not check_zone_access(client, zoneid):
+        return
+    try:
+        zone_name = client.get_hosted_zone(Id=zoneid)['HostedZone']['Name']
+    except Exception as e:
+        print(f"Error: {describe_error(e)}")
+        return
+
+    # המצב הרצוי, עם אינדקס לפי (שם, סוג, Set Identifier). ה-NS וה-SOA של ה-Zone שייכים ל-Route53
+    desired = read_bind_records(stream, zone_name) if file_format == 'bind' else read_ndjson_records(stream)
+    desired = {key: record for key, record in desired.items() if not is_zone_apex_record(record, zone_name)}
+
+    changes = []
+    unchanged = 0
+    if diff_only:
+        try:
+            # מעבר אחד על הרשומות הקיימות: כל רשומה נבדקת מול האינדקס, בלי לשמור את ה-Zone בזיכרון
+            for page in paginate(client, 'list_resource_record_sets', HostedZoneId=zoneid):
+                for live in page['ResourceRecordSets']:
+                    if is_zone_apex_record(live, zone_name):
+                        continue
+                    wanted = desired.pop(record_key(live), None)
+                    if wanted is None:
+                        # קובץ BIND לא יכול לתאר Alias או מדיניות ניתוב, אז רשומות כאלה לא נמחקות בגללו
+                        if file_format == 'bind' and ('AliasTarget' in live or 'SetIdentifier' in live):
+                            unchanged += 1
+                        else:
+                            changes.append({'Action': 'DELETE', 'ResourceRecordSet': live})
+                    elif canonical_record(wanted) == canonical_record(live):
+                        unchanged += 1
+                    else:
+                        changes.append({'Action': 'UPSERT', 'ResourceRecordSet': wanted})
+        except Exception as e:
+            print(f"Error: {describe_error(e)}")
+            return
+        # מה שנשאר באינדקס לא קיים עדיין ב-Zone
+        changes.extend({'Action': 'CREATE', 'ResourceRecordSet': record} for record in desired.values())
+    else:
+        changes = [{'Action': 'UPSERT', 'ResourceRecordSet': record} for record in desired.values()]
+
+    counts = {action: sum(1 for change in changes if change['Action'] == action) for action in ('CREATE', 'UPSERT', 'DELETE')}
+    print(f"{unchanged} unchanged, {counts['CREATE']} to create, {counts['UPSERT']} to update, {counts['DELETE']} to delete")
+    if dry_run:
+        for change in changes:
+            record = change['ResourceRecordSet']
+            print(f"{change['Action']:7} {record['Name']} {record['Type']}")
+        return
+    if not changes:
+        return
+
+    # שולחים לפי הסדר, בכמה שפחות ChangeBatches
+    change_ids = []
+    batches = pack_changes(changes)
+    for number, batch in enumerate(batches, start=1):
+        try:
+            response = client.change_resource_record_sets(HostedZoneId=zoneid, ChangeBatch={'Changes': batch})
+        except Exception as e:
+            print(f"Error: batch {number}/{len(batches)}: {describe_error(e)}")
+            return
+        change_ids.append(response['ChangeInfo']['Id'])
+        print(f"{zoneid}: batch {number}/{len(batches)} sent ({len(batch)} changes)")
+
+    if wait_insync:
+        if wait_for_changes(client, change_ids, timeout):
+            print("All changes are INSYNC")
+        else:
+            print("Error: Timed out waiting for changes to be INSYNC")
+
+def instance_row(instance, region, tags=None):
+    """Builds an inventory row from an EC2 instance description"""
+    # ב-run_instances התגיות לא תמיד חוזרות בתשובה, אז אפשר להעביר אותן מבחוץ
+    tags = tags if tags is not None else {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+    return {
+        'service': 'ec2',
+        'resource_id': instance['InstanceId'],
+        'region': region,
+        'name': tags.get('Name', ''),
+        'state': instance['State']['Name'],
+        'owner': tags.get('Owner', ''),
+        'created_at': instance['LaunchTime'].isoformat(),
+        'tags': json.dumps(tags),
+        'owned': 1
+    }
+
+
+def tagged_row(service, resource_id, name, region, created_at, tags):
+    """Builds an inventory row for a bucket or a hosted zone"""
+    tags = {tag['Key']: tag['Value'] for tag in tags} if tags is not None else {}
+    return {
+        'service': service,
+        'resource_id': resource_id,
+        'region': region,
+        'name': name,
+        'state': 'available',
+        'owner': tags.get('Owner', ''),
+        'created_at': created_at or tags.get('Timestamp', ''),
+        'tags': json.dumps(tags),
+        'owned': int(is_cli_owned([{'Key': k, 'Value': v} for k, v in tags.items()]))
+    }
+
+
+def refresh_ec2(regions, failed):
+    """Returns (rows, regions that were listed) for every instance created by this CLI; failed regions go to `failed`"""
+    # ב-EC2 הסינון לפי תגית נעשה בצד של אמזון, אז רשימה אחת מחזירה רק את השרתים שלנו
+    default_region = get_client('ec2').meta.region_name
+    regions = regions or [default_region]
+    rows = [instance_row(instance, region)
+            for region, instance in iter_regions(regions, lambda region: iter_my_instances(get_client('ec2', region)), failed)]
+    # רק Regions שנבדקו עד הסוף - שרתים של Region שנכשל לא "נעלמו", פשוט לא ראינו אותם
+    return rows, [region for region in regions if region not in failed]
+
+
+def refresh_s3(fresh):
+    """Returns rows for buckets that are new or older than the inventory TTL"""
+    s3_client = get_client('s3')
+    buckets = s3_client.list_buckets()['Buckets']
+
+    # בודקים תגיות רק לדליים חדשים או כאלה שעבר עליהם ה-TTL, במקביל
+    def check(bucket):
+        # האינדקס שומר את כל התגיות, אז כאן תמיד שואלים את אמזון (וזה מעדכן גם את המטמון).
+        # דלי שנמחק בינתיים פשוט לא נכנס לאינדקס, ו-Throttling עולה למעלה ומדווח
+        tags = fetch_bucket_tags(s3_client, bucket['Name'])
+        if tags is None:
+            return None
+        return tagged_row('s3', bucket['Name'], bucket['Name'], bucket.get('BucketRegion', ''),
+                          bucket['CreationDate'].isoformat(), tags)
+
+    stale = [bucket for bucket in buckets if bucket['Name'] not in fresh]
+    with ThreadPool(max_workers=S3_CONFIG['MAX_CONCURRENCY']) as pool:
+        rows = [row for row in pool.map(check, stale) if row is not None]
+    return rows, [bucket['Name'] for bucket in buckets]
+
+
+def refresh_route53(fresh):
+    """Returns rows for hosted zones that are new or older than the inventory TTL"""
+    client = get_client('route53')
+    zones = []
+    for page in paginate(client, 'list_hosted_zones'):
+        zones.extend(page['HostedZones'])
+
+    # תגיות בקבוצות של 10 Zones לקריאה (כמו ב-route53 list)
+    def check(batch):
+        names = {zone['Id'].split('/')[-1]: zone['Name'] for zone in batch}
+        return [tagged_row('route53', zone_id, names[zone_id], 'global', '', tags)
+                for zone_id, tags in fetch_zone_tags(client, names).items()]
+
+    stale = [zone for zone in zones if zone['Id'].split('/')[-1] not in fresh]
+    with ThreadPool(max_workers=ROUTE53_CONFIG['MAX_WORKERS']) as pool:
+        rows = [row for batch_rows in pool.map(check, list(chunks(stale, ROUTE53_CONFIG['TAGS_BATCH_SIZE'])))
+                for row in batch_rows]
+    return rows, [zone['Id'].split('/')[-1] for zone in zones]
+
+
+# מגדיר את הפונקציה הבאה כתת-קבוצה תחת cli, שתרכז את פקודות האינדקס המקומי
+@cli.group()
+def inventory():
+    """Local index of resources created by this CLI"""
+    pass
+
+
+@inventory.command()
+@click.option('--service', 'services', multiple=True, type=click.Choice(['ec2', 's3', 'route53']),
+              help='Only refresh this service (repeatable, default: all)')
+@click.option('--regions', help="Comma separated EC2 regions to refresh, or 'all' (default: the default region)")
+@click.option('--full', is_flag=True, help='Re-check every resource, ignoring the inventory TTL')
+# הפונקציה שמרעננת את האינדקס המקומי מול אמזון
+def refresh(services, regions, full):
+    """Refresh the local inventory index from AWS"""
+    services = services or ('ec2', 's3', 'route53')
+    regions = resolve_regions(regions)
+    ttl = 0 if full else CACHE_CONFIG['INVENTORY_TTL']
+
+    # כל שירות מתרענן ב-Thread משלו; הכתיבה ל-SQLite נעשית רק מה-Thread הראשי
+    jobs = {}
+    failed_regions = {}
+    errors = 0
+    started = time.monotonic()
+    with ThreadPool(max_workers=len(services)) as pool:
+        if 'ec2' in services:
+            jobs['ec2'] = pool.submit(refresh_ec2, regions, failed_regions)
+        if 's3' in services:
+            jobs['s3'] = pool.submit(refresh_s3, inventory_index.fresh_ids('s3', ttl) if ttl else {})
+        if 'route53' in services:
+            jobs['route53'] = pool.submit(refresh_route53, inventory_index.fresh_ids('route53', ttl) if ttl else {})
+
+        for service, job in jobs.items():
+            try:
+                rows, seen = job.result()
+            except Exception as e:
+                print(f"{service}: Error: {describe_error(e)}")
+                errors += 1
+                continue
+            inventory_index.upsert(rows)
+            if service == 'ec2':
+                if failed_regions:
+                    errors += 1
+                    for region, error in sorted(failed_regions.items()):
+                        print(f"ec2: Error: Could not list {region}, its instances were kept: {describe_error(error)}")
+                # ב-EC2 הרשימה כוללת את כל השרתים שלנו, אז כל מה שלא חזר כבר לא קיים (רק ב-Regions שהצליחו,
+                # וכשאף Region לא הצליח לא מוחקים כלום - רשימה ריקה של Regions פירושה "כל ה-Regions")
+                removed = inventory_index.remove_missing('ec2', [row['resource_id'] for row in rows], seen) if seen else 0
+            else:
+                removed = inventory_index.remove_missing(service, seen)
+            print(f"{service}: {len(rows)} checked, {removed} removed")
+
+    print(f"Inventory refreshed in {time.monotonic() - started:.1f}s")
+    if errors:
+        sys.exit(1)
+
+
+# העמודות שמוצגות ב-inventory query, ואלו שאפשר לקבץ לפיהן
+INVENTORY_COLUMNS = ['service', 'resource_id', 'name', 'region', 'state', 'owner', 'created_at']
+
+
+@inventory.command()
+@click.option('--service', type=click.Choice(['ec2', 's3', 'route53']), help='Only this service')
+@click.option('--owner', help='Only resources with this Owner tag')
+@click.option('--state', help='Only resources in this state')
+@click.option('--region', help='Only resources in this region')
+@click.option('--name', help='Only resources whose name contains this text')
+@click.option('--tag', 'tag_values', multiple=True, help='Only resources with this tag, Key=Value (repeatable)')
+@click.option('--group-by', type=click.Choice(['service', 'region', 'state', 'owner']), help='Count resources per group')
+@click.option('--output', type=click.Choice(['table', 'json', 'ndjson']), default='table', show_default=True)
+# הפונקציה שעונה על שאלות מתוך האינדקס המקומי, בלי לפנות לאמזון בכלל
+def query(service, owner, state, region, name, tag_values, group_by, output):
+    """Query the local inventory index (no AWS calls)"""
+    where = ''
+    params = []
+    for column, value in (('service', service), ('owner', owner), ('state', state), ('region', region)):
+        if value:
+            where += f' AND {column} = ?'
+            params.append(value)
+    if name:
+        where += ' AND name LIKE ?'
+        params.append(f'%{name}%')
+    for key, value in parse_tag_selector(tag_values).items():
+        where += ' AND json_extract(tags, ?) = ?'
+        params += [f'$."{key}"', value]
+
+    rows = inventory_index.query(where, params, group_by)
+    if group_by:
+        print_rows(rows, [group_by, 'count'], output)
+    else:
+        print_rows(({column: row[column] for column in INVENTORY_COLUMNS} for row in rows), INVENTORY_COLUMNS, output)
+
+
+# --- CLEANUP ---
+class CleanupProgress:
+    """Per-service counters for the cleanup readout, shared by all the teardown threads"""
+
+    def __init__(self, totals):
+        self.totals = totals
+        self.done = {service: 0 for service in totals}
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def step(self, service, message, amount=1):
+        with self.lock:
+            self.done[service] += amount
+            print(f"{service}: [{self.done[service]}/{self.totals[service]}] {message}")
+
+    def error(self, service, message):
+        with self.lock:
+            self.failed += 1
+            print(f"Error: {service}: {message}")
+
+
+def find_my_buckets(owner=None):
+    """Returns the names of buckets created by this CLI (optionally only of one Owner)"""
+    s3_client = get_client('s3')
+
+    # מחיקה היא סופית, אז בודקים תגיות עדכניות מאמזון ולא סומכים על המטמון
+    def check(bucket):
+        tags = fetch_bucket_tags(s3_client, bucket['Name'])
+        if tags and is_cli_owned(tags) and (not owner or get_tag({'Tags': tags}, 'Owner') == owner):
+            return bucket['Name']
+        return None
+
+    with ThreadPool(max_workers=S3_CONFIG['MAX_CONCURRENCY']) as pool:
+        return [name for name in pool.map(check, s3_client.list_buckets()['Buckets']) if name]
+
+
+def find_my_zones(owner=None):
+    """Returns (zone id, name) of hosted zones created by this CLI (optionally only of one Owner)"""
+    client = get_client('route53')
+    zones = [(zone['Id'].split('/')[-1], zone['Name'])
+             for page in paginate(client, 'list_hosted_zones') for zone in page['HostedZones']]
+
+    # תגיות לעד 10 Zones בקריאה אחת (כמו ב-route53 list). מחיקה היא סופית, אז תמיד תגיות עדכניות ולא מהמטמון
+    def check(batch):
+        tags = fetch_zone_tags(client, [zone_id for zone_id, _ in batch])
+        return [(zone_id, name) for zone_id, name in batch
+                if is_cli_owned(tags.get(zone_id, [])) and (not owner or get_tag({'Tags': tags[zone_id]}, 'Owner') == owner)]
+
+    with ThreadPool(max_workers=ROUTE53_CONFIG['MAX_WORKERS']) as pool:
+        return [zone for batch in pool.map(check, list(chunks(zones, ROUTE53_CONFIG['TAGS_BATCH_SIZE']))) for zone in batch]
+
+
+def terminate_all(instances, progress):
+    """Terminates (region, instance id) pairs in bulk calls, one region after another"""
+    by_region = {}
+    for region, instance_id in instances:
+        by_region.setdefault(region, []).append(instance_id)
+    for region, instance_ids in by_region.items():
+        ec2_client = get_client('ec2', region)
+        for batch in chunks(instance_ids, EC2_CONFIG['ACTION_BATCH_SIZE']):
+            try:
+                ec2_client.terminate_instances(InstanceIds=batch)
+            except Exception as e:
+                progress.error('ec2', describe_error(e))
+                continue
+            write_through(lambda: inventory_index.set_state('ec2', batch, ACTION_STATES['terminate']))
+            progress.step('ec2', f"terminating {len(batch)} instance(s) in {region or ec2_client.meta.region_name}", len(batch))
+
+
+def delete_bucket_completely(s3_client, bucket, pool):
+    """Deletes every object version and delete marker of a bucket in parallel batches, then the bucket"""
+    # מחיקה של Batch אחד (עד 1000 מפתחות). עם Quiet אמזון מחזירה רק את מה שנכשל
+    def delete_batch(objects):
+        response = s3_client.delete_objects(Bucket=bucket, Delete={'Objects': objects, 'Quiet': True})
+        errors = response.get('Errors', [])
+        if errors:
+            raise RuntimeError(f"{len(errors)} object(s) were not deleted, e.g. {errors[0]['Key']}: {errors[0]['Message']}")
+        return len(objects)
+
+    deleted = 0
+    pending = set()
+    batch = []
+
+    def flush(return_when):
+        nonlocal deleted, pending
+        done, pending = wait(pending, return_when=return_when)
+        deleted += sum(future.result() for future in done)
+
+    # מוחקים תוך כדי מעבר על הרשימה, אז הדפים יכולים "לזוז" ולדלג על חלק מהאובייקטים.
+    # לכן עוברים שוב ושוב עד שהרשימה ריקה (זה תופס גם אובייקטים שנכתבו בזמן המחיקה)
+    while True:
+        before = deleted
+        # list_object_versions מחזיר גם את כל הגרסאות וגם את ה-Delete Markers (ובדלי בלי גרסאות - את האובייקטים עצמם)
+        for page in paginate(s3_client, 'list_object_versions', Bucket=bucket):
+            for item in page.get('Versions', []) + page.get('DeleteMarkers', []):
+                batch.append({'Key': item['Key'], 'VersionId': item['VersionId']})
+                if len(batch) == S3_CONFIG['DELETE_BATCH_SIZE']:
+                    pending.add(pool.submit(delete_batch, batch))
+                    batch = []
+                    # לא צוברים יותר מדי Batches בזיכרון - מחכים שמשהו יסתיים
+                    if len(pending) >= S3_CONFIG['MAX_CONCURRENCY'] * 2:
+                        flush(FIRST_COMPLETED)
+        if batch:
+            pending.add(pool.submit(delete_batch, batch))
+            batch = []
+        if pending:
+            flush(ALL_COMPLETED)
+        if deleted == before:
+            break
+    s3_client.delete_bucket(Bucket=bucket)
+    return deleted
+
+
+def delete_all_buckets(buckets, progress):
+    """Empties and deletes buckets, several at once, with one shared pool for the delete batches"""
+    s3_client = get_client('s3')
+    with ThreadPool(max_workers=S3_CONFIG['MAX_CONCURRENCY']) as batch_pool:
+        def delete(bucket):
+            try:
+                deleted = delete_bucket_completely(s3_client, bucket, batch_pool)
+            except Exception as e:
+                progress.error('s3', f"{bucket}: {describe_error(e)}")
+                return
+            write_through(lambda: inventory_index.remove('s3', [bucket]))
+            ownership_cache.forget('s3', bucket)
+            progress.step('s3', f"deleted bucket {bucket} ({deleted} object versions)")
+
+        with ThreadPool(max_workers=4) as bucket_pool:
+            list(bucket_pool.map(delete, buckets))
+
+
+def delete_zone_completely(client, zone_id, zone_name):
+    """Deletes all of a zone's records (except the apex NS/SOA) and then the zone itself"""
+    changes = []
+    for page in paginate(client, 'list_resource_record_sets', HostedZoneId=zone_id):
+        for record in page['ResourceRecordSets']:
+            # ה-NS וה-SOA של ה-Zone עצמו נמחקים יחד איתו (ואי אפשר למחוק אותם קודם)
+            if record['Type'] in ('NS', 'SOA') and record['Name'] == zone_name:
+                continue
+            changes.append({'Action': 'DELETE', 'ResourceRecordSet': record})
+    # בדרך כלל הכל נכנס ל-ChangeBatch אחד, ורק Zone ענק מתחלק לכמה
+    for batch in pack_changes(changes):
+        client.change_resource_record_sets(HostedZoneId=zone_id, ChangeBatch={'Changes': batch})
+    client.delete_hosted_zone(Id=zone_id)
+    return len(changes)
+
+
+def delete_all_zones(zones, progress):
+    """Deletes hosted zones in parallel (the route53 ServiceLimiter keeps the pace)"""
+    client = get_client('route53')
+
+    def delete(zone):
+        zone_id, zone_name = zone
+        try:
+            records = delete_zone_completely(client, zone_id, zone_name)
+        except Exception as e:
+            progress.error('route53', f"{zone_name} ({zone_id}): {describe_error(e)}")
+            return
+        write_through(lambda: inventory_index.remove('route53', [zone_id]))
+        ownership_cache.forget('route53', zone_id)
+        progress.step('route53', f"deleted zone {zone_name} ({zone_id}, {records} records)")
+
+    with ThreadPool(max_workers=ROUTE53_CONFIG['MAX_WORKERS']) as pool:
+        list(pool.map(delete, zones))
+
+
+# מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) ישירות תחת cli
+@cli.command()
+@click.option('--owner', help='Only resources with this Owner tag')
+@click.option('--service', 'services', multiple=True, type=click.Choice(['ec2', 's3', 'route53']),
+              help='Only clean these services (repeatable, default: all)')
+@click.option('--regions', help="EC2 regions to clean, comma separated or 'all' (default: the current region)")
+@click.option('--dry-run', is_flag=True, help='Only print what would be deleted')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation')
+# הפונקציה שמוחקת את כל מה שהכלי יצר (במקום השלבים הידניים ב-README)
+def cleanup(owner, services, regions, dry_run, yes):
+    """Delete every resource created by this CLI"""
+    services = services or ('ec2', 's3', 'route53')
+    regions = resolve_regions(regions)
+    # שרתים שכבר בדרך למחיקה לא צריך למחוק שוב
+    states = [state for state in EC2_CONFIG['ACTIVE_STATES'] if state != 'shutting-down']
+
+    def find_instances():
+        if not regions:
+            return [(None, instance['InstanceId']) for instance in iter_my_instances(get_client('ec2'), states, owner=owner)]
+        return [(region, instance['InstanceId']) for region, instance in
+                iter_regions(regions, lambda region: iter_my_instances(get_client('ec2', region), states, owner=owner), failed_regions)]
+
+    failed_regions = {}
+
+    # 1. מוצאים את המשאבים של שלושת השירותים במקביל
+    finders = {'ec2': find_instances, 's3': lambda: find_my_buckets(owner), 'route53': lambda: find_my_zones(owner)}
+    found = {}
+    with ThreadPool(max_workers=len(services)) as pool:
+        jobs = {service: pool.submit(finders[service]) for service in services}
+        for service, job in jobs.items():
+            try:
+                found[service] = job.result()
+            except Exception as e:
+                # אם לא הצלחנו לראות הכל, לא מוחקים כלום
+                print(f"Error: Could not list {service} resources: {describe_error(e)}")
+                sys.exit(1)
+    # Region שנכשל יכול להסתיר שרתים שלנו - גם אז לא מוחקים כלום, אפילו לא ב-Regions שהצליחו
+    if failed_regions:
+        for region, error in sorted(failed_regions.items()):
+            print(f"Error: Could not list ec2 instances in {region}: {describe_error(error)}")
+        print("Nothing was deleted.")
+        sys.exit(1)
+
+    # 2. מדפיסים את התוכנית
+    if not any(found.values()):
+        print("Nothing to clean up.")
+        return
+    print("Cleanup plan:")
+    if found.get('ec2'):
+        print(f"  ec2: terminate {len(found['ec2'])} instance(s): {' '.join(instance_id for _, instance_id in found['ec2'])}")
+    for bucket in found.get('s3', []):
+        print(f"  s3: empty (all versions) and delete bucket {bucket}")
+    for zone_id, zone_name in found.get('route53', []):
+        print(f"  route53: delete all records and zone {zone_name} ({zone_id})")
+    if dry_run:
+        print("Dry run - nothing was deleted.")
+        return
+    if not yes:
+        click.confirm("Delete all of the above?", abort=True)
+
+    # 3. מוחקים - שלושת השירותים במקביל, וכל אחד מהם עם מקביליות משלו
+    progress = CleanupProgress({service: len(resources) for service, resources in found.items()})
+    teardowns = {'ec2': terminate_all, 's3': delete_all_buckets, 'route53': delete_all_zones}
+    started = time.perf_counter()
+    with ThreadPool(max_workers=len(found)) as pool:
+        jobs = [pool.submit(teardowns[service], resources, progress) for service, resources in found.items() if resources]
+        for job in jobs:
+            job.result()
+
+    print(f"Cleanup finished in {time.perf_counter() - started:.2f}s with {progress.failed} error(s)")
+    if progress.failed:
+        sys.exit(1)
+
+
+# --- DAEMON MODE ---
+# לאן הולך הפלט של הפקודה הנוכחית: חיבור ב-serve או צעד ב-batch. None = ריצה רגילה, הפלט הולך למסך
+_daemon_request = contextvars.ContextVar('daemon_request', default=None)
+
+
+class DaemonRequest:
+    """One client connection to `serve`: sends framed stdout/stderr/exit messages back"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+        # כל מה שהלקוח שולח אחרי שורת הבקשה הוא ה-stdin של הפקודה
+        self.stdin = sock.makefile('rb')
+
+    def send(self, channel, data):
+        # מסגרת: תו אחד של ערוץ (o/e/x/f), 4 בתים של אורך, ואז התוכן
+        with self.lock:
+            self.sock.sendall(channel + len(data).to_bytes(4, 'big') + data)
+
+
+class _RoutedBinary:
+    """Binary side (.buffer) of a routed stdout/stderr"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        request = _daemon_request.get()
+        if request is None:
+            return self.stream.original.buffer.write(data)
+        request.send(self.stream.channel, bytes(data))
+        return len(data)
+
+    def flush(self):
+        if _daemon_request.get() is None:
+            self.stream.original.buffer.flush()
+
+
+class RoutedOutput:
+    """sys.stdout/sys.stderr replacement that sends each request's output to its own client"""
+
+    def __init__(self, original, channel):
+        self.original = original
+        self.channel = channel
+        self.encoding = 'utf-8'
+        self.errors = 'replace'
+        self.buffer = _RoutedBinary(self)
+
+    def write(self, text):
+        request = _daemon_request.get()
+        if request is None:
+            return self.original.write(text)
+        request.send(self.channel, text.encode('utf-8', 'replace'))
+        return len(text)
+
+    def flush(self):
+        if _daemon_request.get() is None:
+            self.original.flush()
+
+    def isatty(self):
+        return False
+
+
+class RoutedInput:
+    """sys.stdin replacement that reads each request's input from its own client"""
+
+    def __init__(self, original):
+        self.original = original
+
+    def _source(self):
+        request = _daemon_request.get()
+        return request.stdin if request else self.original.buffer
+
+    @property
+    def buffer(self):
+        return self._source()
+
+    def readline(self, size=-1):
+        return self._source().readline(size).decode('utf-8', 'replace')
+
+    def read(self, size=-1):
+        return self._source().read(size).decode('utf-8', 'replace')
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def isatty(self):
+        return False
+
+
+def daemon_env():
+    """The environment values that must match between a client and the daemon"""
+    # פרופיל, Region ותיקיית הבית משפיעים על התוצאה - אם הם שונים, לא שולחים לשרת
+    return {key: value for key, value in os.environ.items()
+            if key.startswith('AWS_') or key.startswith('PLATFORM_CLI_')}
+
+
+def run_cli(argv):
+    """Runs one CLI command in this process and returns its exit code"""
+    try:
+        # standalone_mode מטפל בשגיאות של Click בדיוק כמו בריצה רגילה, ומסיים ב-SystemExit
+        cli.main(args=argv, prog_name='main.py', standalone_mode=True)
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def handle_daemon_request(sock):
+    """Runs one forwarded command inside the daemon"""
+    request = DaemonRequest(sock)
+    try:
+        header = json.loads(request.stdin.readline())
+        # הלקוח רץ בתיקייה אחרת או עם הגדרות AWS אחרות - שיריץ את הפקודה בעצמו
+        if header['cwd'] != os.getcwd() or header['env'] != daemon_env():
+            request.send(b'f', b'')
+            return
+        _daemon_request.set(request)
+        request.send(b'x', str(run_cli(header['argv'])).encode())
+    except (OSError, ValueError, KeyError):
+        # הלקוח התנתק באמצע או שלח בקשה לא תקינה - אין למי לדווח
+        pass
+    finally:
+        sock.close()
+
+
+def find_args(argv, names):
+    """Returns the args that are one of names, including options given as --option=value"""
+    return [arg for arg in argv if arg in names or (arg.startswith('--') and arg.split('=', 1)[0] in names)]
+
+
+def forward_to_daemon(argv):
+    """Runs the command in a running `serve` daemon; returns only if it must run locally"""
+    socket_path = DAEMON_CONFIG['SOCKET']
+    # פקודות שמשנות מצב גלובלי של התהליך רצות תמיד מקומית
+    if (os.environ.get('PLATFORM_CLI_NO_DAEMON') or not os.path.exists(socket_path)
+            or find_args(argv, DAEMON_CONFIG['LOCAL_ONLY'])):
+        return
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        # אין שרת פעיל (קובץ ישן) - רצים כרגיל
+        sock.close()
+        return
+
+    header = {'argv': argv, 'cwd': os.getcwd(), 'env': daemon_env()}
+    sock.sendall(json.dumps(header).encode() + b'\n')
+
+    # מעבירים את ה-stdin שלנו לשרת ברקע (לשאלות אישור, או לקבצים שמגיעים מ-pipe)
+    def pump_stdin():
+        try:
+            # קריאה ישירה מה-fd (בלי Buffer של פייתון) כדי שה-Thread לא יתקע את סגירת התהליך
+            for chunk in iter(lambda: os.read(sys.stdin.fileno(), 64 * 1024), b''):
+                sock.sendall(chunk)
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    threading.Thread(target=pump_stdin, daemon=True).start()
+
+    replies = sock.makefile('rb')
+    outputs = {b'o': sys.stdout.buffer, b'e': sys.stderr.buffer}
+    while True:
+        frame = replies.read(5)
+        if len(frame) < 5:
+            print("Error: Lost connection to the platform-cli daemon.", file=sys.stderr)
+            sys.exit(1)
+        channel, length = frame[:1], int.from_bytes(frame[1:], 'big')
+        data = replies.read(length)
+        if channel in outputs:
+            outputs[channel].write(data)
+            outputs[channel].flush()
+        elif channel == b'x':
+            sys.exit(int(data))
+        else:
+            # השרת ביקש שנריץ בעצמנו (תיקייה או הגדרות שונות)
+            sock.close()
+            return
+
+
+# מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) ישירות תחת cli
+@cli.command()
+@click.option('--socket', 'socket_path', default=lambda: DAEMON_CONFIG['SOCKET'], show_default='~/.yarin-platform-cli/daemon.sock',
+              help='Unix socket to listen on')
+# הפונקציה שמפעילה תהליך קבוע שמריץ פקודות עבור ה-CLI
+def serve(socket_path):
+    """Keep a warm process that runs CLI commands sent over a Unix socket"""
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            print(f"Error: A daemon is already listening on {socket_path}")
+            return
+        except OSError:
+            # קובץ שנשאר מריצה קודמת שקרסה
+            os.remove(socket_path)
+        finally:
+            probe.close()
+
+    os.makedirs(os.path.dirname(socket_path) or '.', exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # רק המשתמש הנוכחי יכול להתחבר - אחרת כל אחד היה מריץ פקודות עם ההרשאות שלו ב-AWS
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(DAEMON_CONFIG['MAX_REQUESTS'])
+
+    # מכאן כל print הולך ללקוח של הבקשה שרצה באותו Context
+    sys.stdout = RoutedOutput(sys.stdout, b'o')
+    sys.stderr = RoutedOutput(sys.stderr, b'e')
+    sys.stdin = RoutedInput(sys.stdin)
+    # ה-Session וה-Clients נבנים מראש ונשארים חמים בין בקשות
+    get_session()
+    print(f"Serving on {socket_path} (Ctrl+C to stop)")
+
+    pool = ThreadPool(max_workers=DAEMON_CONFIG['MAX_REQUESTS'])
+    try:
+        while True:
+            connection, _ = server.accept()
+            pool.submit(handle_daemon_request, connection)
+    except KeyboardInterrupt:
+        print("\nStopping daemon...")
+    finally:
+        server.close()
+        os.remove(socket_path)
+        pool.shutdown(wait=True)
+
+
+
+# --- BATCH MODE ---
+class CapturedOutput:
+    """Collects the stdout/stderr of one batch step, so parallel steps don't mix their output"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chunks = []
+        # לצעד אין stdin - שאלת אישור תיכשל, ולכן ב-terminate צריך --yes
+        self.stdin = io.BytesIO()
+
+    def send(self, channel, data):
+        with self.lock:
+            self.chunks.append((channel, data))
+
+    def text(self):
+        return b''.join(data for _, data in self.chunks).decode('utf-8', 'replace')
+
+    def failed(self):
+        # הפקודות מדפיסות Error ויוצאות בלי קוד שגיאה, אז בודקים גם את הפלט
+        return any(line.startswith(BATCH_CONFIG['FAILURE_PREFIXES']) for line in self.text().splitlines())
+
+    def replay(self):
+        outputs = {b'o': sys.stdout, b'e': sys.stderr}
+        for channel, data in self.chunks:
+            outputs[channel].write(data.decode('utf-8', 'replace'))
+
+
+def read_batch_lines(stream):
+    """Parses one command per line; a `wait` line makes the next steps wait for the ones above it"""
+    steps = []
+    # הצעדים מאז ה-wait האחרון, ואלה שהצעדים הבאים צריכים לחכות להם
+    current, barrier = [], []
+    for number, line in enumerate(stream, start=1):
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}")
+        if not args:
+            continue
+        if args == ['wait']:
+            # מספיק לחכות לקטע האחרון - הוא עצמו כבר חיכה לכל מה שלפניו
+            if current:
+                current, barrier = [], current
+            continue
+        step_id = f'line-{number}'
+        steps.append({'id': step_id, 'args': args, 'depends_on': barrier})
+        current.append(step_id)
+    return steps
+
+
+def read_batch_plan(data):
+    """Parses a JSON/YAML plan: a list of steps (or {"steps": [...]}) with id, command and depends_on"""
+    items = data.get('steps') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise ValueError('the plan must be a list of steps (or {"steps": [...]})')
+    steps = []
+    for number, item in enumerate(items, start=1):
+        # צעד יכול להיות גם רק הפקודה עצמה (מחרוזת או רשימה)
+        if isinstance(item, (str, list)):
+            item = {'command': item}
+        if not isinstance(item, dict) or 'command' not in item:
+            raise ValueError(f"step {number} has no command")
+        command = item['command']
+        args = shlex.split(command) if isinstance(command, str) else [str(arg) for arg in command]
+        depends_on = item.get('depends_on') or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        steps.append({'id': str(item.get('id', f'step-{number}')), 'args': args,
+                      'depends_on': [str(step_id) for step_id in depends_on]})
+    return steps
+
+
+def load_yaml(stream):
+    """Loads a YAML document (PyYAML is only needed for YAML plans)"""
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("YAML plans need PyYAML (pip install pyyaml)")
+    try:
+        return yaml.safe_load(stream)
+    except yaml.YAMLError as e:
+        raise ValueError(str(e))
+
+
+def check_batch_steps(steps):
+    """Returns an error message if the steps can't run as given, otherwise None"""
+    ids = set()
+    for step in steps:
+        if step['id'] in ids:
+            return f"Duplicate step id '{step['id']}'"
+        ids.add(step['id'])
+        if not step['args']:
+            return f"Step '{step['id']}' has an empty command"
+        forbidden = find_args(step['args'], BATCH_CONFIG['NOT_ALLOWED'])
+        if forbidden:
+            return f"Step '{step['id']}' cannot use '{forbidden[0]}' inside batch"
+    for step in steps:
+        missing = [step_id for step_id in step['depends_on'] if step_id not in ids]
+        if missing:
+            return f"Step '{step['id']}' depends on unknown step '{missing[0]}'"
+
+    # מיון טופולוגי: אם לא הצלחנו "לסיים" את כל הצעדים, יש מעגל של תלויות
+    waiting = {step['id']: len(set(step['depends_on'])) for step in steps}
+    dependents = batch_dependents(steps)
+    ready = [step_id for step_id, count in waiting.items() if count == 0]
+    finished = 0
+    while ready:
+        finished += 1
+        for dependent in dependents.get(ready.pop(), []):
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+    if finished < len(steps):
+        return "The plan has a dependency cycle"
+    return None
+
+
+def batch_dependents(steps):
+    """Maps each step id to the ids of the steps that wait for it"""
+    dependents = {}
+    for step in steps:
+        for step_id in set(step['depends_on']):
+            dependents.setdefault(step_id, []).append(step['id'])
+    return dependents
+
+
+def run_batch_step(step):
+    """Runs one step with its own captured output; returns (exit code, output, seconds)"""
+    output = CapturedOutput()
+    # ה-ContextVar הזה שייך רק ל-Thread של הצעד, אז כל print שלו נאסף כאן
+    _daemon_request.set(output)
+    started = time.perf_counter()
+    code = run_cli(step['args'])
+    return code, output, time.perf_counter() - started
+
+
+# מגדיר את הפונקציה הבאה כפקודה ביצועית (Command) ישירות תחת cli
+@cli.command()
+# קובץ הפקודות. אפשר להעביר - כדי לקרוא מה-stdin
+@click.option('--file', 'stream', required=True, type=click.File('r'), help='Command lines, or a JSON/YAML plan (- for stdin)')
+@click.option('--format', 'file_format', type=click.Choice(['lines', 'json', 'yaml']), help='File format (default: by file extension)')
+@click.option('--workers', default=BATCH_CONFIG['MAX_WORKERS'], show_default=True, type=click.IntRange(min=1),
+              help='How many steps run at the same time')
+@click.option('--fail-fast', is_flag=True, help='Do not start new steps after a step fails')
+# הפונקציה שמריצה הרבה פקודות בתהליך אחד
+def batch(stream, file_format, workers, fail_fast):
+    """Run many commands in one process (shared clients, parallel steps)"""
+    # אם לא צוין פורמט, מנחשים לפי הסיומת של הקובץ
+    if file_format is None:
+        extension = os.path.splitext(str(stream.name))[1].lower().lstrip('.')
+        file_format = {'json': 'json', 'yaml': 'yaml', 'yml': 'yaml'}.get(extension, 'lines')
+    try:
+        if file_format == 'lines':
+            steps = read_batch_lines(stream)
+        else:
+            steps = read_batch_plan(json.load(stream) if file_format == 'json' else load_yaml(stream))
+    except ValueError as e:
+        print(f"Error: Invalid batch file: {e}")
+        sys.exit(1)
+    error = check_batch_steps(steps)
+    if error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    steps_by_id = {step['id']: step for step in steps}
+    waiting = {step['id']: len(set(step['depends_on'])) for step in steps}
+    dependents = batch_dependents(steps)
+    # id -> (status, seconds)
+    results = {}
+
+    def describe(step_id):
+        return ' '.join(shlex.quote(arg) for arg in steps_by_id[step_id]['args'])
+
+    def skip_after(step_id):
+        # כל מי שתלוי (גם בעקיפין) בצעד שלא הצליח - לא ירוץ
+        pending = list(dependents.get(step_id, []))
+        while pending:
+            dependent = pending.pop()
+            if dependent not in results:
+                results[dependent] = ('skipped', 0.0)
+                print(f"[skipped] {dependent}: {describe(dependent)}")
+                pending.extend(dependents.get(dependent, []))
+
+    # הפלט של כל צעד נאסף בנפרד דרך אותו מנגנון של serve, ומודפס בשלמותו כשהצעד מסתיים
+    original_streams = sys.stdout, sys.stderr, sys.stdin
+    if not isinstance(sys.stdout, RoutedOutput):
+        sys.stdout = RoutedOutput(sys.stdout, b'o')
+        sys.stderr = RoutedOutput(sys.stderr, b'e')
+        sys.stdin = RoutedInput(sys.stdin)
+
+    started = time.perf_counter()
+    try:
+        with ThreadPool(max_workers=workers) as pool:
+            running = {}
+            # אחרי כישלון עם --fail-fast לא מתחילים צעדים חדשים
+            stopping = False
+
+            def submit(step_id):
+                running[pool.submit(run_batch_step, steps_by_id[step_id])] = step_id
+
+            for step in steps:
+                if waiting[step['id']] == 0:
+                    submit(step['id'])
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    code, output, seconds = future.result()
+                    ok = code == 0 and not output.failed()
+                    results[step_id] = ('ok' if ok else 'failed', seconds)
+                    print(f"[{'ok' if ok else 'FAILED'}] {step_id} ({seconds:.2f}s): {describe(step_id)}")
+                    output.replay()
+                    if ok:
+                        for dependent in dependents.get(step_id, []):
+                            waiting[dependent] -= 1
+                            if waiting[dependent] == 0 and not stopping:
+                                submit(dependent)
+                        continue
+                    skip_after(step_id)
+                    # --fail-fast: מבטלים צעדים שעוד לא התחילו (אלה שכבר רצים מסתיימים כרגיל)
+                    if fail_fast:
+                        stopping = True
+                        for pending_future, pending_id in list(running.items()):
+                            if pending_future.cancel():
+                                running.pop(pending_future)
+    finally:
+        sys.stdout, sys.stderr, sys.stdin = original_streams
+
+    # צעדים שלא רצו בגלל --fail-fast
+    for step in steps:
+        if step['id'] not in results:
+            results[step['id']] = ('skipped', 0.0)
+            print(f"[skipped] {step['id']}: {describe(step['id'])}")
+
+    counts = {status: 0 for status in ('ok', 'failed', 'skipped')}
+    for status, _ in results.values():
+        counts[status] += 1
+    print(f"Batch finished in {time.perf_counter() - started:.2f}s: {counts['ok']} ok, "
+          f"{counts['failed']} failed, {counts['skipped']} skipped")
+    failed = [step['id'] for step in steps if results[step['id']][0] == 'failed']
+    if failed:
+        print(f"Error: Failed steps: {', '.join(failed)}")
+    if failed or counts['skipped']:
+        sys.exit(1)
+
 if __name__ == '__main__':
+    # אם רץ serve - הפקודה נשלחת אליו, ואחרת רצה כאן כרגיל
+    forward_to_daemon(sys.argv[1:])
     cli()
\ No newline at end of file
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+
+def step(*args):
+    return {'id': '1', 'args': list(args), 'depends_on': []}
+
+
+@pytest.mark.parametrize('args', [
+    ['--trace-file', '/tmp/x.json', 's3', 'list'],
+    ['--trace-file=/tmp/x.json', 's3', 'list'],
+    ['--timings', 's3', 'list'],
+    ['serve'],
+])
+def test_local_only_options_are_rejected_in_both_forms(args):
+    assert "cannot use" in main.check_batch_steps([step(*args)])
+
+
+def test_regular_steps_are_accepted():
+    assert main.check_batch_steps([step('s3', 'list'), {'id': '2', 'args': ['ec2', 'list'], 'depends_on': ['1']}]) is None
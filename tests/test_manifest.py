@@ -0,0 +1,34 @@
+import io
+import os
+import sys
+
+import click
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+
+def read(text, file_format):
+    stream = io.StringIO(text)
+    stream.name = f'buckets.{file_format}'
+    return main.read_bucket_manifest(stream, file_format, 'private', {})
+
+
+@pytest.mark.parametrize('text, file_format, message', [
+    ('["mb5"]', 'json', 'buckets.json: Bucket 1: expected an object'),
+    ('[{"name": ', 'json', 'buckets.json: invalid JSON'),
+    ('{"other": []}', 'json', "'buckets' list"),
+    ('[{"name": "a", "tags": ["x"]}]', 'json', 'buckets.json: Bucket 1: tags must be'),
+    ('{"name": "a"}\n{bad\n', 'ndjson', 'buckets.ndjson: Bucket 2:'),
+    ('name,tags\na,k=v\nb,foo\n', 'csv', 'tags of bucket 2 in buckets.csv'),
+])
+def test_bad_manifests_name_the_file_and_bucket(text, file_format, message):
+    with pytest.raises(click.ClickException) as error:
+        read(text, file_format)
+    assert message in error.value.format_message()
+
+
+def test_valid_manifest():
+    buckets = read('name,access,tags\na,PUBLIC,k=v|x=y\n', 'csv')
+    assert buckets == [{'name': 'a', 'access': 'public', 'tags': {'k': 'v', 'x': 'y'}}]
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+
+def fetch(region):
+    """Fake per-region listing: 'bad' regions fail after one item"""
+    yield f'{region}-1'
+    if region.startswith('bad'):
+        raise RuntimeError(f'{region} is down')
+    yield f'{region}-2'
+
+
+def test_failed_regions_are_reported_in_the_dict():
+    failed = {}
+    items = sorted(item for _, item in main.iter_regions(['ok-1', 'bad-1'], fetch, failed))
+    assert items == ['bad-1-1', 'ok-1-1', 'ok-1-2']
+    assert list(failed) == ['bad-1']
+
+
+def test_failed_regions_raise_without_a_dict():
+    with pytest.raises(main.RegionError) as error:
+        list(main.iter_regions(['ok-1', 'bad-1', 'bad-2'], fetch))
+    assert sorted(error.value.errors) == ['bad-1', 'bad-2']
+
+
+def test_consumer_can_stop_early():
+    """Closing the generator must not wait for workers stuck on the bounded queue"""
+    def many(region):
+        yield from range(5000)
+
+    regions = main.iter_regions(['a', 'b', 'c'], many)
+    next(regions)
+    regions.close()
@@ -0,0 +1,58 @@
+import io
+import os
+import sys
+
+import click
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+
+def record_changes(text, file_format):
+    return list(main.read_record_changes(io.StringIO(text), file_format, 'Z1'))
+
+
+@pytest.mark.parametrize('text, file_format, message', [
+    ('[{"name": "a"', 'json', 'Invalid JSON'),
+    ('{"records": []}', 'json', "'changes' list"),
+    ('[1]', 'json', 'Record 1: expected an object'),
+    ('{"name": "a", "value": "1.2.3.4"}\n\n{oops\n', 'ndjson', 'Record 3:'),
+    ('{"name": "a", "value": "1.2.3.4"}\n"a"\n', 'ndjson', 'Record 2: expected an object'),
+])
+def test_malformed_change_files_name_the_record(text, file_format, message):
+    with pytest.raises(click.ClickException) as error:
+        record_changes(text, file_format)
+    assert message in error.value.format_message()
+
+
+def test_valid_ndjson_changes():
+    [(zoneid, change)] = record_changes('{"name": "a.ex.com", "value": "1.2.3.4", "ttl": 60}\n', 'ndjson')
+    assert zoneid == 'Z1'
+    assert change['ResourceRecordSet']['TTL'] == 60
+
+
+ZONE = """$ORIGIN ex.com.
+$TTL 300
+@       IN SOA ns1 admin (1 7200 900 1209600 300)
+@       IN NS  ns1
+        IN NS  ns2.other.net.
+@       IN MX  10 mail
+www     IN CNAME web
+_sip._tcp IN SRV 10 60 5060 @
+4       IN PTR host
+web     IN A 1.2.3.4
+txt     IN TXT "web"
+"""
+
+
+def test_bind_names_in_values_are_qualified():
+    records = {(record['Name'], record['Type']): [value['Value'] for value in record['ResourceRecords']]
+               for record in main.read_bind_records(io.StringIO(ZONE), 'ex.com').values()}
+    assert records[('ex.com.', 'NS')] == ['ns1.ex.com.', 'ns2.other.net.']
+    assert records[('ex.com.', 'MX')] == ['10 mail.ex.com.']
+    assert records[('www.ex.com.', 'CNAME')] == ['web.ex.com.']
+    assert records[('_sip._tcp.ex.com.', 'SRV')] == ['10 60 5060 ex.com.']
+    assert records[('4.ex.com.', 'PTR')] == ['host.ex.com.']
+    assert records[('web.ex.com.', 'A')] == ['1.2.3.4']
+    assert records[('txt.ex.com.', 'TXT')] == ['"web"']
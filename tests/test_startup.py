@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+# מריץ את main.py --help בתהליך נפרד, ובסוף מדפיס אם botocore נטען
+RUNNER = """
+import runpy, sys
+sys.argv = [sys.argv[1], '--help']
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+print('botocore loaded:', 'botocore' in sys.modules)
+"""
+
+
+def test_help_does_not_import_botocore():
+    """`main.py --help` must stay fast: boto3/botocore are only imported by commands that call AWS"""
+    result = subprocess.run([sys.executable, '-c', RUNNER, MAIN], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert 'Usage:' in result.stdout
+    assert 'botocore loaded: False' in result.stdout
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+moto = pytest.importorskip('moto')
+
+BUCKET = 'sync-test-bucket'
+
+
+@pytest.fixture
+def s3_client(tmp_path, monkeypatch):
+    """An owned bucket in an in-process moto, with the CLI state kept under tmp_path"""
+    for name in ('AWS_ENDPOINT_URL', 'AWS_PROFILE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setitem(main.CACHE_CONFIG, 'DIR', str(tmp_path / 'home'))
+    monkeypatch.setattr(main, 'ownership_cache', main.OwnershipCache(str(tmp_path / 'cache.db'), 60, 100))
+    monkeypatch.setattr(main, '_clients', {})
+    with moto.mock_aws():
+        client = main.get_client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        client.put_bucket_tagging(Bucket=BUCKET, Tagging={'TagSet': main.get_aws_tags({})})
+        yield client
+
+
+def sync(directory, direction):
+    result = CliRunner().invoke(main.cli, ['s3', 'sync', '--dir', str(directory), '--bucket', BUCKET,
+                                           '--direction', direction])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def put_multipart(client, key, parts):
+    """Uploads an object in the given parts, so it gets a multipart ETag"""
+    upload_id = client.create_multipart_upload(Bucket=BUCKET, Key=key)['UploadId']
+    etags = [client.upload_part(Bucket=BUCKET, Key=key, UploadId=upload_id, PartNumber=number, Body=body)['ETag']
+             for number, body in enumerate(parts, 1)]
+    client.complete_multipart_upload(Bucket=BUCKET, Key=key, UploadId=upload_id, MultipartUpload={
+        'Parts': [{'ETag': etag, 'PartNumber': number} for number, etag in enumerate(etags, 1)]})
+
+
+def test_same_size_multipart_overwrite_is_downloaded(s3_client, tmp_path):
+    first = 5 * main.MB * b'a'
+    put_multipart(s3_client, 'a.bin', [first, b'hello'])
+    assert 'download: a.bin' in sync(tmp_path / 'dir', 'down')
+
+    # אותו גודל, והקובץ המקומי קיבל את זמן השינוי מהענן - רק ה-ETag מסגיר את השינוי
+    put_multipart(s3_client, 'a.bin', [first, b'HELLO'])
+    assert 'download: a.bin' in sync(tmp_path / 'dir', 'down')
+    assert (tmp_path / 'dir' / 'a.bin').read_bytes().endswith(b'HELLO')
+
+    assert '1 unchanged' in sync(tmp_path / 'dir', 'down')
+
+
+def test_touched_identical_file_is_not_uploaded_again(s3_client, tmp_path):
+    directory = tmp_path / 'dir'
+    directory.mkdir()
+    (directory / 'a.txt').write_bytes(b'hello')
+    assert 'upload: a.txt' in sync(directory, 'up')
+
+    stat = os.stat(directory / 'a.txt')
+    os.utime(directory / 'a.txt', (stat.st_atime, stat.st_mtime + 10))
+    assert 'upload: a.txt' not in sync(directory, 'up')
+
+    (directory / 'a.txt').write_bytes(b'HELLO')
+    assert 'upload: a.txt' in sync(directory, 'up')
+
+
+def test_multipart_etag_matches_the_local_file(tmp_path):
+    path = tmp_path / 'big'
+    path.write_bytes(b'x' * 10 + b'y' * 5)
+    parts = [main.hashlib.md5(b'x' * 10).digest(), main.hashlib.md5(b'y' * 5).digest()]
+    expected = f'"{main.hashlib.md5(b"".join(parts)).hexdigest()}-2"'
+    assert main.file_multipart_etag(str(path), 10, 2) == expected
+    assert main.file_multipart_etag(str(path), 10, 3) is None